@@ -0,0 +1,94 @@
+import calendar
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+import numpy as np
+
+from series import PRICE_FIELDS, PriceSeries
+
+# Day ranges ("1d", "5d") count trading sessions, not calendar days, so
+# they get no start time and are fetched directly
+_RANGE = re.compile(r"(\d+)(wk|mo|y)")
+# Upper bounds, so a computed start never falls after the one Yahoo uses
+_RANGE_SECONDS = {"wk": 7 * 86400, "mo": 31 * 86400, "y": 366 * 86400}
+_COLUMNS = PRICE_FIELDS + ("adjclose",)
+
+
+def range_start(range_, now=None):
+    # Unix start time covered by a Yahoo `range` value, or None for ranges
+    # the store can't reason about (e.g. "max")
+    now = time.time() if now is None else now
+    if range_ == "ytd":
+        return calendar.timegm((time.gmtime(now).tm_year, 1, 1, 0, 0, 0))
+    m = _RANGE.fullmatch(range_ or "")
+    if not m:
+        return None
+    return int(now - int(m.group(1)) * _RANGE_SECONDS[m.group(2)])
+
+
+class BarStore:
+    # Per-(ticker, interval) price bars plus bookkeeping: the earliest start
+    # time they cover and when the tail was last fetched. With a root
+    # directory each series is one structured .npy file (read memory-mapped)
+    # and a JSON sidecar, replaced atomically on every write; without one
+    # the `max_memory` most recently used series stay in memory.
+
+    def __init__(self, root=None, max_memory=1000):
+        self.root = root
+        self.max_memory = max_memory
+        self.evictions = 0
+        self._memory = OrderedDict()
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def _paths(self, ticker, interval):
+        base = os.path.join(self.root, quote(interval, safe=""), quote(ticker.upper(), safe=""))
+        return base + ".npy", base + ".json"
+
+    def load(self, ticker, interval):
+        key = (ticker.upper(), interval)
+        if not self.root:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None, {}
+            self._memory.move_to_end(key)
+            return entry
+        bars_path, info_path = self._paths(ticker, interval)
+        try:
+            with open(info_path) as f:
+                info = json.load(f)
+            bars = np.load(bars_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None, {}
+        columns = {name: bars[name] for name in _COLUMNS if name in info.get("columns", [])}
+        series = PriceSeries(bars["timestamp"], columns, info.get("meta"))
+        return series, info
+
+    def save(self, ticker, interval, series, info):
+        info = {**info, "meta": series.meta, "columns": list(series.columns)}
+        key = (ticker.upper(), interval)
+        if not self.root:
+            self._memory[key] = (series, info)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+            return
+        bars_path, info_path = self._paths(ticker, interval)
+        os.makedirs(os.path.dirname(bars_path), exist_ok=True)
+        bars = np.empty(len(series), dtype=[("timestamp", "<i8")] + [(name, "<f8") for name in _COLUMNS])
+        bars["timestamp"] = series.timestamp
+        for name in _COLUMNS:
+            bars[name] = series.columns.get(name, np.nan)
+        for path, write in (
+            (bars_path, lambda f: np.save(f, bars)),
+            (info_path, lambda f: f.write(json.dumps(info).encode())),
+        ):
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
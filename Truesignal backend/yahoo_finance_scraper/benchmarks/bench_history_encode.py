@@ -0,0 +1,73 @@
+# Payload size and encode time for /history responses, per format.
+#
+#   python benchmarks/bench_history_encode.py [--bars 100000]
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from series import SERIES_FORMATS, PriceSeries  # noqa: E402
+
+
+def make_chart(bars, seed=0):
+    # Roughly what interval=1m over a few months looks like, gaps included
+    rng = random.Random(seed)
+    price = 100.0
+    quote = {field: [] for field in ("open", "high", "low", "close", "volume")}
+    for _ in range(bars):
+        if rng.random() < 0.01:
+            for values in quote.values():
+                values.append(None)
+            continue
+        open_ = price
+        price = max(1.0, price * (1 + rng.gauss(0, 0.001)))
+        quote["open"].append(round(open_, 4))
+        quote["close"].append(round(price, 4))
+        quote["high"].append(round(max(open_, price) * (1 + rng.random() / 500), 4))
+        quote["low"].append(round(min(open_, price) * (1 - rng.random() / 500), 4))
+        quote["volume"].append(rng.randint(1000, 500000))
+    return {
+        "meta": {"symbol": "BENCH", "dataGranularity": "1m"},
+        "timestamp": [1700000000 + 60 * i for i in range(bars)],
+        "indicators": {"quote": [quote]},
+    }
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=100000)
+    args = parser.parse_args()
+
+    chart = make_chart(args.bars)
+    print(f"{args.bars} bars")
+    print(f"{'path':>22} {'ms':>8} {'bytes':>11}")
+    seconds, body = timed(lambda: json.dumps(jsonable_encoder(chart)).encode())
+    print(f"{'jsonable_encoder+json':>22} {seconds * 1000:8.1f} {len(body):>11}")
+    seconds, series = timed(lambda: PriceSeries.from_chart(chart))
+    print(f"{'from_chart':>22} {seconds * 1000:8.1f} {'':>11}")
+    for name, (_, encode) in SERIES_FORMATS.items():
+        try:
+            seconds, body = timed(lambda: encode(series))
+        except RuntimeError as e:
+            print(f"{name:>22} skipped ({e})")
+            continue
+        print(f"{name:>22} {seconds * 1000:8.1f} {len(body):>11}")
+
+
+if __name__ == "__main__":
+    main()
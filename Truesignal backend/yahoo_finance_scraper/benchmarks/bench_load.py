@@ -0,0 +1,138 @@
+# Throughput and latency of the API under concurrent load, against the
+# offline Yahoo stand-in (benchmarks/upstream.py) instead of the network.
+#
+#   python benchmarks/bench_load.py [--endpoints quote,news,history,company]
+#       [--concurrency 32] [--requests 500] [--symbols 200]
+#       [--latency 0.05] [--jitter 0.05] [--fail-401 0] [--fail-429 0]
+#       [--rate-limit 0] [--warm]
+#
+# Requests go through the ASGI app in-process, so the numbers cover routing,
+# caching, coalescing, rate limiting and parsing but not socket overhead.
+# Each endpoint starts from an empty cache unless --warm is given.
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+import main as api  # noqa: E402
+from barstore import BarStore  # noqa: E402
+from cache import ResponseCache  # noqa: E402
+from upstream import YahooStandIn  # noqa: E402
+
+
+def make_symbols(count):
+    known = ["AAPL", "MSFT", "NVDA", "SPY", "BTC-USD"]
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    extra = ["".join(letters[(i // 26 ** k) % 26] for k in range(3)) + "X" for i in range(max(0, count - len(known)))]
+    return (known + extra)[:count]
+
+
+ENDPOINTS = {
+    "quote": lambda rng, symbols: ("/quote", {"symbols": ",".join(rng.sample(symbols, min(5, len(symbols))))}),
+    "news": lambda rng, symbols: ("/news", {"ticker": rng.choice(symbols)}),
+    "history": lambda rng, symbols: ("/history", {"ticker": rng.choice(symbols), "range_": "1y"}),
+    "company": lambda rng, symbols: ("/company", {"query": rng.choice(symbols)}),
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100.0 * len(sorted_values)))]
+
+
+def make_scraper(standin, args):
+    rate_limit = args.rate_limit or 1e-9
+    return api.AsyncYahooFinanceScraper(
+        rate_limit=rate_limit,
+        burst=3 if args.rate_limit else 10**9,
+        sessions=args.sessions,
+        transport=standin.transport(),
+        cache=ResponseCache(),
+        bars=BarStore(),
+    )
+
+
+async def run_endpoint(name, args, symbols):
+    standin = YahooStandIn(latency=args.latency, jitter=args.jitter, fail_401=args.fail_401, fail_429=args.fail_429)
+    api.scraper = make_scraper(standin, args)
+    rng = random.Random(0)
+    make_request = ENDPOINTS[name]
+    latencies = []
+    statuses = Counter()
+    empty = 0
+
+    async with api.lifespan(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            if args.warm:
+                for symbol in symbols:
+                    path, params = make_request(random.Random(symbol), [symbol])
+                    await client.get(path, params=params)
+            remaining = args.requests
+
+            async def worker():
+                nonlocal remaining, empty
+                while remaining > 0:
+                    remaining -= 1
+                    path, params = make_request(rng, symbols)
+                    start = time.perf_counter()
+                    resp = await client.get(path, params=params)
+                    latencies.append(time.perf_counter() - start)
+                    statuses[resp.status_code] += 1
+                    # Endpoints swallow upstream failures and answer with empty bodies
+                    if resp.status_code != 200 or len(resp.content) < 64:
+                        empty += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    upstream = sum(standin.calls.values())
+    print(
+        f"{name:>8} {len(latencies):>6} {len(latencies) / elapsed:>8.1f} "
+        f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f} "
+        f"{latencies[-1] * 1000:>8.1f} {empty:>6} {upstream:>9}"
+    )
+    if args.verbose:
+        print(f"{'':>8} upstream {standin.stats()}")
+
+
+async def run(args):
+    symbols = make_symbols(args.symbols)
+    print(
+        f"concurrency={args.concurrency} symbols={len(symbols)} latency={args.latency}+{args.jitter}s "
+        f"401={args.fail_401} 429={args.fail_429} rate_limit={args.rate_limit or 'off'} warm={args.warm}"
+    )
+    print(f"{'endpoint':>8} {'reqs':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'empty':>6} {'upstream':>9}")
+    for name in args.endpoints.split(","):
+        await run_endpoint(name.strip(), args, symbols)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--fail-401", type=float, default=0.0)
+    parser.add_argument("--fail-429", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="seconds between upstream requests per host and session; 0 = unthrottled")
+    parser.add_argument("--warm", action="store_true", help="touch every symbol once before measuring")
+    parser.add_argument("--verbose", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Compares the original pairwise Levenshtein headline dedup with NewsDeduper.
+#
+#   python benchmarks/bench_news_dedup.py [--sizes 20,100,300,1000] [--legacy-max 300]
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news import NewsDeduper  # noqa: E402
+
+COMPANIES = ["Apple", "Nvidia", "Tesla", "Microsoft", "Amazon", "Meta", "Alphabet", "AMD", "Netflix", "Intel"]
+TEMPLATES = [
+    "{c} stock {dir} {p}% after Q{q} earnings beat, EPS +{e}%",
+    "{c} shares {dir} as revenue {r}% tops analyst estimates",
+    "{c} raises full-year guidance {g}%, citing strong AI demand",
+    "{c} fined ${f},000,000 by EU regulators over competition concerns",
+    "{c} announces layoffs {n} employees in restructuring push",
+    "Analysts upgrade {c} to buy with price target ${t}",
+    "Why {c} stock is {dir2} today",
+    "{c} CEO says company will invest ${f} billion in new data centers",
+    "{c} unveils new product lineup at annual developer conference",
+    "Is {c} a buy after its {p}% {dir3} this week?",
+]
+SOURCES = ["", " - Reuters", " | Bloomberg", " (CNBC)", " - Yahoo Finance"]
+
+
+def make_headlines(count, seed=0):
+    # About a third of the headlines are near-duplicate rewrites of earlier ones
+    rng = random.Random(seed)
+    headlines = []
+    while len(headlines) < count:
+        if headlines and rng.random() < 0.35:
+            base = rng.choice(headlines)
+            variant = base + rng.choice(SOURCES)
+            if rng.random() < 0.5:
+                variant = variant.replace(" ", "  ", 1).rstrip(".") + rng.choice(["", ".", "!"])
+            headlines.append(variant)
+            continue
+        headlines.append(rng.choice(TEMPLATES).format(
+            c=rng.choice(COMPANIES),
+            dir=rng.choice(["jumps", "falls", "surges", "slides"]),
+            dir2=rng.choice(["soaring", "sinking", "rallying"]),
+            dir3=rng.choice(["drop", "gain", "rally"]),
+            p=rng.randint(1, 30), q=rng.randint(1, 4), e=rng.randint(1, 60),
+            r=rng.randint(1, 40), g=rng.randint(1, 20), f=rng.randint(1, 900),
+            n=rng.randint(50, 20000), t=rng.randint(50, 900),
+        ))
+    return [{"title": h, "url": f"https://finance.yahoo.com/news/{i}.html"} for i, h in enumerate(headlines)]
+
+
+def legacy_dedupe(news):
+    # The implementation /news and /company used before NewsDeduper
+    def normalize_title(title):
+        return ''.join(c for c in title.lower() if c not in string.punctuation).strip()
+    seen = []
+    deduped = []
+    for item in news:
+        norm = normalize_title(item.get("title", ""))
+        def levenshtein(a, b):
+            if a == b:
+                return 0
+            if len(a) < len(b):
+                return levenshtein(b, a)
+            if len(b) == 0:
+                return len(a)
+            previous_row = range(len(b) + 1)
+            for i, c1 in enumerate(a):
+                current_row = [i + 1]
+                for j, c2 in enumerate(b):
+                    insertions = previous_row[j + 1] + 1
+                    deletions = current_row[j] + 1
+                    substitutions = previous_row[j] + (c1 != c2)
+                    current_row.append(min(insertions, deletions, substitutions))
+                previous_row = current_row
+            return previous_row[-1]
+        is_dup = False
+        for s in seen:
+            dist = levenshtein(norm, s) / max(1, max(len(norm), len(s)))
+            if dist < 0.15:
+                is_dup = True
+                break
+        if not norm or is_dup:
+            continue
+        seen.append(norm)
+        deduped.append(item)
+    return deduped
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="20,100,300,1000")
+    parser.add_argument("--legacy-max", type=int, default=300, help="skip the O(n^2 L^2) baseline above this size")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'headlines':>9} {'kept':>5} {'legacy ms':>10} {'fresh ms':>9} {'warm ms':>8} {'speedup':>8} {'same':>5}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        news = make_headlines(size, seed=size)
+        fresh_time, fresh = timed(lambda: NewsDeduper().dedupe(news), args.repeat)
+
+        # Second request for the same ticker: every headline is already indexed
+        deduper = NewsDeduper()
+        deduper.dedupe(news, ticker="BENCH")
+        warm_time, _ = timed(lambda: deduper.dedupe(news, ticker="BENCH"), args.repeat)
+
+        if size <= args.legacy_max:
+            legacy_time, legacy = timed(lambda: legacy_dedupe(news), 1)
+            same = "yes" if [i["url"] for i in legacy] == [i["url"] for i in fresh] else "no"
+            legacy_ms = f"{legacy_time * 1000:10.1f}"
+            speedup = f"{legacy_time / fresh_time:7.0f}x"
+        else:
+            legacy_ms, speedup, same = f"{'-':>10}", f"{'-':>8}", "-"
+        print(f"{size:>9} {len(fresh):>5} {legacy_ms} {fresh_time * 1000:9.2f} {warm_time * 1000:8.2f} {speedup} {same:>5}")
+
+
+if __name__ == "__main__":
+    main()
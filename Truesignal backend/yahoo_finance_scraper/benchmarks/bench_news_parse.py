@@ -0,0 +1,95 @@
+# Parse time for a Yahoo quote/news page, per parser backend.
+#
+#   python benchmarks/bench_news_parse.py [--page saved.html ...] [--max-articles 10]
+#
+# Without --page a synthetic page shaped like the real one is used: a large
+# <head> of inline scripts, the stream list, then a long tail of markup.
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from newsparse import NewsPageParser, SoupNewsParser  # noqa: E402
+
+CHUNK = 16384  # roughly what httpx hands back per read
+
+
+def make_page(items=60, seed=0):
+    rng = random.Random(seed)
+    words = "apple shares rally earnings revenue guidance beats misses analysts upgrade cut fed rates".split()
+
+    def sentence(n):
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    head = "".join(
+        f'<script type="application/json" id="s{i}">{{"data": "{"x" * 4000}"}}</script>' for i in range(80)
+    )
+    nav = "".join(f'<li class="nav-item"><a href="/nav/{i}">{sentence(2)}</a></li>' for i in range(40))
+    stream = "".join(
+        f'<li class="js-stream-content Pos(r)"><div class="Ov(h)"><div>'
+        f'<a href="/news/{i}-{sentence(3).replace(" ", "-")}.html"><h3 class="Mb(5px)">'
+        f'<u class="StretchedBox"></u>{sentence(10)} <b>{i}%</b></h3></a>'
+        f'<p class="Fz(14px)">{sentence(30)}</p><div class="C(#959595)"><span>Reuters</span></div>'
+        f"</div></div></li>"
+        for i in range(items)
+    )
+    tail = "".join(f'<div class="module"><p>{sentence(20)}</p></div>' for i in range(3000))
+    tail += "".join(f"<script>window.x{i}={{}};</script>" for i in range(200))
+    return (
+        f"<!DOCTYPE html><html><head><meta charset=\"utf-8\">{head}</head><body>"
+        f'<header><ul>{nav}</ul></header><main><ul class="My(0) P(0)">{stream}</ul></main>'
+        f"{tail}</body></html>"
+    ).encode("utf-8")
+
+
+def parse(page, max_articles, parser):
+    if parser == "soup":
+        p = SoupNewsParser(max_articles, encoding="utf-8")
+    else:
+        p = NewsPageParser(max_articles, parser=parser, encoding="utf-8")
+    fed = 0
+    for start in range(0, len(page), CHUNK):
+        fed = start + CHUNK
+        if p.feed(page[start:fed]):
+            break
+    return p.close(), min(fed, len(page))
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page", action="append", default=[])
+    parser.add_argument("--max-articles", type=int, default=10)
+    args = parser.parse_args()
+
+    pages = [(path, open(path, "rb").read()) for path in args.page] or [("synthetic", make_page())]
+    for name, page in pages:
+        print(f"{name}: {len(page)} bytes, max_articles={args.max_articles}")
+        print(f"{'parser':>16} {'ms':>8} {'bytes read':>11} {'articles':>9}")
+        baseline = None
+        for label, backend, limit in (
+            ("soup", "soup", args.max_articles),
+            ("lxml (full page)", "lxml", 10**9),
+            ("lxml", "lxml", args.max_articles),
+        ):
+            seconds, (articles, read) = timed(lambda: parse(page, limit, backend))
+            if baseline is None:
+                baseline = articles
+            elif articles[:len(baseline)] != baseline:
+                print(f"  {label} output differs from soup")
+            print(f"{label:>16} {seconds * 1000:8.2f} {read:>11} {len(articles):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# Offline stand-in for the Yahoo endpoints the scraper talks to, served from
+# the recorded pages in benchmarks/fixtures as an httpx transport:
+#
+#   standin = YahooStandIn(latency=0.05, fail_429=0.01)
+#   scraper = AsyncYahooFinanceScraper(transport=standin.transport(), ...)
+#
+# Any ticker is answered: unknown symbols reuse the AAPL fixtures with the
+# symbol swapped in and a per-symbol price level, so load tests can spread
+# over a large universe. Latency, 401 (expired crumb) and 429 (throttled)
+# responses are injected at the configured rates, and the consent wall can
+# be switched on to exercise the guce.yahoo.com flow.
+import asyncio
+import calendar
+import copy
+import json
+import os
+import random
+import time
+import zlib
+from collections import Counter
+
+import httpx
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+_INTERVAL_SECONDS = {
+    "1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "90m": 5400, "1h": 3600,
+    "1d": 86400, "5d": 432000, "1wk": 604800, "1mo": 2592000, "3mo": 7776000,
+}
+_RANGE_SECONDS = {"d": 86400, "mo": 2592000, "y": 31536000}
+MAX_BARS = 20000
+
+
+def _range_seconds(range_):
+    if range_ == "max":
+        return 40 * _RANGE_SECONDS["y"]
+    if range_ == "ytd":
+        return time.time() - calendar.timegm((time.gmtime().tm_year, 1, 1, 0, 0, 0))
+    for unit in ("mo", "d", "y"):
+        if range_.endswith(unit) and range_[:-len(unit)].isdigit():
+            return int(range_[:-len(unit)]) * _RANGE_SECONDS[unit]
+    return _RANGE_SECONDS["y"]
+
+
+def _load(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        data = f.read()
+    return json.loads(data) if name.endswith(".json") else data.decode("utf-8")
+
+
+class YahooStandIn:
+    def __init__(self, latency=0.0, jitter=0.0, fail_401=0.0, fail_429=0.0, consent=False, seed=0):
+        self.latency = latency  # seconds added to every response
+        self.jitter = jitter  # plus up to this many seconds, uniformly
+        self.fail_401 = fail_401  # share of crumb-carrying requests answered 401
+        self.fail_429 = fail_429  # share of API requests answered 429
+        self.consent = consent
+        self.rng = random.Random(seed)
+        self.calls = Counter()  # route -> requests served
+        self.statuses = Counter()
+
+        quotes = _load("quote.json")["quoteResponse"]["result"]
+        self.quotes = {q["symbol"]: q for q in quotes}
+        self.search = _load("search.json")
+        self.chart = _load("chart.json")["chart"]["result"][0]
+        self.summary = _load("quoteSummary.json")["quoteSummary"]["result"][0]
+        self.news = _load("news.html")
+        self.quote_page = _load("quote_page.html")
+        self.consent_page = _load("consent.html")
+
+    def transport(self):
+        return httpx.MockTransport(self.handle)
+
+    def stats(self):
+        return {"calls": dict(self.calls), "statuses": dict(self.statuses)}
+
+    async def handle(self, request):
+        route, handler = self._route(request)
+        self.calls[route] += 1
+        delay = self.latency + (self.rng.random() * self.jitter if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        response = self._inject(request, route) or handler(request)
+        self.statuses[response.status_code] += 1
+        return response
+
+    def _route(self, request):
+        host, path = request.url.host, request.url.path
+        if host == "guce.yahoo.com":
+            return "consent", self._consent
+        if path.startswith("/v7/finance/quote"):
+            return "quote", self._quote
+        if path.startswith("/v1/finance/search"):
+            return "search", self._search
+        if path.startswith("/v8/finance/chart/"):
+            return "chart", self._chart
+        if path.startswith("/v10/finance/quoteSummary/"):
+            return "quoteSummary", self._quote_summary
+        if path.startswith("/quote/") and path.rstrip("/").endswith("/news"):
+            return "news", self._news
+        if path.startswith("/quote/"):
+            return "quote_page", self._page
+        return "unknown", lambda request: httpx.Response(404)
+
+    def _inject(self, request, route):
+        if route not in ("quote", "search", "chart", "quoteSummary", "news"):
+            return None
+        if self.fail_429 and self.rng.random() < self.fail_429:
+            return httpx.Response(429, headers={"Retry-After": "1"}, text="Too Many Requests")
+        if self.fail_401 and "crumb" in request.url.params and self.rng.random() < self.fail_401:
+            return httpx.Response(401, json={"finance": {"result": None, "error": {"code": "Unauthorized", "description": "Invalid Crumb"}}})
+        return None
+
+    @staticmethod
+    def _level(symbol):
+        # Stable per-symbol price multiplier so tickers don't all look alike
+        return 0.2 + (zlib.crc32(symbol.encode()) % 1000) / 250.0
+
+    def _quote_for(self, symbol):
+        known = self.quotes.get(symbol)
+        if known is not None:
+            return known
+        q = dict(self.quotes["AAPL"])
+        level = self._level(symbol)
+        for key, value in q.items():
+            if isinstance(value, float) and key.startswith(("regularMarket", "fiftyTwo", "fiftyDay", "twoHundred", "bid", "ask")):
+                q[key] = round(value * level, 2)
+        q.update(symbol=symbol, shortName=f"{symbol} Inc.", longName=f"{symbol} Incorporated")
+        return q
+
+    # --- routes ---
+
+    def _page(self, request):
+        if self.consent and "A1" not in request.headers.get("cookie", ""):
+            return httpx.Response(200, text=self.consent_page)
+        return httpx.Response(200, text=self.quote_page, headers={"Set-Cookie": "A3=d=bench; Domain=.yahoo.com; Path=/"})
+
+    def _consent(self, request):
+        if request.method == "POST":
+            return httpx.Response(200, text="<html>ok</html>", headers={"Set-Cookie": "A1=d=bench; Domain=.yahoo.com; Path=/"})
+        return httpx.Response(200, text=self.consent_page)
+
+    def _quote(self, request):
+        symbols = [s for s in request.url.params.get("symbols", "").split(",") if s]
+        return httpx.Response(200, json={"quoteResponse": {"result": [self._quote_for(s) for s in symbols], "error": None}})
+
+    def _search(self, request):
+        q = request.url.params.get("q", "").strip()
+        needle = q.lower()
+        matches = [
+            item for item in self.search["quotes"]
+            if needle and (item["symbol"].lower().startswith(needle) or needle in item["longname"].lower())
+        ]
+        if not matches and q:
+            symbol = q.upper()
+            matches = [dict(self.search["quotes"][0], symbol=symbol, shortname=f"{symbol} Inc.", longname=f"{symbol} Incorporated")]
+        return httpx.Response(200, json=dict(self.search, quotes=matches, count=len(matches)))
+
+    def _chart(self, request):
+        symbol = request.url.path.rsplit("/", 1)[-1]
+        params = request.url.params
+        interval = params.get("interval", "1d")
+        step = _INTERVAL_SECONDS.get(interval, 86400)
+        now = int(time.time())
+        if "period1" in params and "period2" in params:
+            start, end = int(params["period1"]), min(int(params["period2"]), now)
+        else:
+            start, end = now - int(_range_seconds(params.get("range", "1y"))), now
+        # Replay the recorded price path at the requested spacing, newest bar last
+        end -= end % step
+        count = max(0, min(MAX_BARS, (end - start) // step + 1))
+        recorded = self.chart["indicators"]["quote"][0]
+        n = len(recorded["close"])
+        level = 1.0 if symbol == "AAPL" else self._level(symbol)
+        rows = {field: [] for field in recorded}
+        for i in range(count):
+            j = (n - count + i) % n
+            for field, values in recorded.items():
+                value = values[j]
+                rows[field].append(value if field == "volume" else round(value * level, 2))
+        result = copy.deepcopy({k: v for k, v in self.chart.items() if k not in ("timestamp", "indicators")})
+        result["meta"].update(symbol=symbol, dataGranularity=interval, range=params.get("range", ""))
+        result["timestamp"] = [end - (count - 1 - i) * step for i in range(count)]
+        result["indicators"] = {"quote": [rows], "adjclose": [{"adjclose": list(rows["close"])}]}
+        return httpx.Response(200, json={"chart": {"result": [result], "error": None}})
+
+    def _quote_summary(self, request):
+        modules = [m for m in request.url.params.get("modules", "").split(",") if m]
+        result = {m: self.summary[m] for m in modules if m in self.summary}
+        return httpx.Response(200, json={"quoteSummary": {"result": [result], "error": None}})
+
+    def _news(self, request):
+        return httpx.Response(200, text=self.news, headers={"Content-Type": "text/html; charset=utf-8"})
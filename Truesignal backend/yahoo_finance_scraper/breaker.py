@@ -0,0 +1,60 @@
+import time
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    # Closed: requests flow and consecutive failures are counted. After
+    # `threshold` of them the breaker opens and requests fail fast for
+    # `reset_timeout` seconds; then one probe is let through (half-open) and
+    # its outcome closes the breaker or re-opens it for another period.
+
+    def __init__(self, threshold=5, reset_timeout=30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.opens = 0
+        self.rejected = 0
+
+    def allow(self):
+        if self.state == "closed":
+            return True
+        now = time.monotonic()
+        if self.state == "open" and now - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self.probe_started = now
+            return True
+        # A probe that never reported back (cancelled) doesn't wedge the breaker
+        if self.state == "half_open" and now - self.probe_started >= self.reset_timeout:
+            self.probe_started = now
+            return True
+        self.rejected += 1
+        return False
+
+    def success(self):
+        self.state = "closed"
+        self.failures = 0
+
+    def failure(self):
+        # Returns True if this failure opened the breaker
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.opens += 1
+            return True
+        return False
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "rejected": self.rejected,
+            "open_for": round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 3) if self.state == "open" else 0.0,
+        }
@@ -0,0 +1,466 @@
+# Coordination broker for running the API with several worker processes.
+#
+# Each uvicorn worker has its own scraper, so without coordination N workers
+# mean N rate budgets against Yahoo, N crumb inits and N cold caches. The
+# broker is one small asyncio process on a Unix socket that holds the state
+# that has to be global:
+#
+#   - the token buckets (one RateLimiter, so priorities and 429 backoff apply
+#     across all workers)
+#   - a shared response cache tier, behind each worker's own memory cache
+#   - the sessions: one worker fetches a crumb, the rest adopt its cookies
+#
+# Run it with the workers:
+#
+#   python broker.py --socket /tmp/yahoo-broker.sock --workers 4 -- --port 8000
+#
+# or on its own, pointing already-running workers at it with YAHOO_BROKER.
+# Messages are newline-delimited JSON objects. A request carries "id" and
+# "op" and gets back {"id", "result"} or {"id", "error"}; a message without
+# an id is a notification and gets no reply.
+import argparse
+import asyncio
+import itertools
+import os
+import signal
+import sys
+import time
+
+import orjson
+
+from cache import MemoryBackend
+from ratelimit import RateLimiter, request_priority
+
+MAX_LINE = 64 * 1024 * 1024  # a cached chart or news page fits comfortably
+
+
+class BrokerUnavailable(Exception):
+    pass
+
+
+class BrokerError(Exception):
+    pass
+
+
+class Broker:
+    # Ops that may wait; they run as tasks so one worker's queued acquire
+    # doesn't hold up the rest of its messages
+    BLOCKING_OPS = frozenset({"acquire", "session_claim"})
+
+    def __init__(self, limiter, cache_size=50000, grant_timeout=60.0):
+        self.limiter = limiter
+        self.cache = MemoryBackend(max_entries=cache_size)
+        self.grant_timeout = grant_timeout  # a worker that claimed a refresh and went quiet loses it
+        self.sessions = {}  # index -> {"crumb", "cookies", "refreshed", "generation"}
+        self._grants = {}  # index -> (token, deadline, event, connection)
+        self._tokens = itertools.count(1)
+        self._connections = itertools.count(1)
+        self.connected = 0
+        self.ops = {}
+
+    async def start(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        return await asyncio.start_unix_server(self._serve, path=path, limit=MAX_LINE)
+
+    async def _serve(self, reader, writer):
+        conn = next(self._connections)
+        tasks = {}
+        self.connected += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                msg = orjson.loads(line)
+                op = msg.get("op")
+                self.ops[op] = self.ops.get(op, 0) + 1
+                if op == "cancel":
+                    task = tasks.get(msg.get("ref"))
+                    if task is not None:
+                        task.cancel()
+                    continue
+                handler = getattr(self, f"op_{op}", None)
+                args = msg.get("args") or {}
+                msg_id = msg.get("id")
+                if handler is None:
+                    if msg_id is not None:
+                        self._reply(writer, msg_id, error=f"unknown op {op!r}")
+                    continue
+                if op in self.BLOCKING_OPS:
+                    task = asyncio.ensure_future(self._run(writer, msg_id, handler, conn, args))
+                    if msg_id is not None:
+                        tasks[msg_id] = task
+                        task.add_done_callback(lambda _, msg_id=msg_id: tasks.pop(msg_id, None))
+                    continue
+                # Everything else is a dict operation; answer inline, in order
+                try:
+                    result = handler(conn, **args)
+                except Exception as e:
+                    if msg_id is not None:
+                        self._reply(writer, msg_id, error=str(e) or type(e).__name__)
+                else:
+                    if msg_id is not None:
+                        self._reply(writer, msg_id, result=result)
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self.connected -= 1
+            for task in list(tasks.values()):
+                task.cancel()
+            # Refreshes this worker had claimed are up for grabs again
+            for index, grant in list(self._grants.items()):
+                if grant[3] == conn:
+                    self._release(index)
+            writer.close()
+
+    async def _run(self, writer, msg_id, handler, conn, args):
+        try:
+            result = await handler(conn, **args)
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            if msg_id is not None:
+                self._reply(writer, msg_id, error=str(e) or type(e).__name__)
+            return
+        if msg_id is not None and not writer.is_closing():
+            self._reply(writer, msg_id, result=result)
+
+    @staticmethod
+    def _reply(writer, msg_id, result=None, error=None):
+        if writer.is_closing():
+            return
+        msg = {"id": msg_id, "error": error} if error is not None else {"id": msg_id, "result": result}
+        writer.write(orjson.dumps(msg) + b"\n")
+
+    # --- rate limiting ---
+
+    async def op_acquire(self, conn, host, identity=None, priority=None):
+        return await self.limiter.acquire(host, priority, identity)
+
+    def op_backoff(self, conn, host, identity=None, retry_after=None):
+        self.limiter.backoff(host, identity, retry_after)
+
+    def op_recover(self, conn, host, identity=None):
+        self.limiter.recover(host, identity)
+
+    # --- response cache ---
+
+    def op_cache_get(self, conn, keys):
+        entries = (self.cache.get(key) for key in keys)
+        return [list(entry) if entry is not None else None for entry in entries]
+
+    def op_cache_set(self, conn, key, value, expires):
+        self.cache.set(key, value, expires)
+
+    def op_cache_info(self, conn):
+        return {"entries": len(self.cache), "max_entries": self.cache.max_entries, "evictions": self.cache.evictions}
+
+    # --- sessions ---
+
+    async def op_session_claim(self, conn, index, stale_crumb=None):
+        # The shared session for `index`, unless the caller found it stale. In
+        # that case one caller is granted the refresh and the rest wait for it.
+        while True:
+            current = self.sessions.get(index)
+            if current is not None and current["crumb"] != stale_crumb:
+                return {"session": current}
+            grant = self._grants.get(index)
+            now = time.monotonic()
+            if grant is None or grant[1] <= now:
+                token = next(self._tokens)
+                self._grants[index] = (token, now + self.grant_timeout, asyncio.Event(), conn)
+                if grant is not None:
+                    grant[2].set()
+                return {"grant": token}
+            try:
+                await asyncio.wait_for(grant[2].wait(), grant[1] - now)
+            except asyncio.TimeoutError:
+                pass
+
+    def op_session_publish(self, conn, index, crumb, cookies):
+        current = self.sessions.get(index)
+        self.sessions[index] = {
+            "crumb": crumb,
+            "cookies": cookies,
+            "refreshed": time.time(),
+            "generation": (current["generation"] + 1) if current else 1,
+        }
+        self._release(index)
+        return self.sessions[index]["generation"]
+
+    def op_session_release(self, conn, index, token):
+        # The refresh failed; let the next claimer try
+        grant = self._grants.get(index)
+        if grant is not None and grant[0] == token:
+            self._release(index)
+
+    def _release(self, index):
+        grant = self._grants.pop(index, None)
+        if grant is not None:
+            grant[2].set()
+
+    def op_stats(self, conn):
+        now = time.time()
+        return {
+            "workers": self.connected,
+            "ops": self.ops,
+            "ratelimit": self.limiter.stats(),
+            "cache": self.op_cache_info(conn),
+            "sessions": {
+                str(index): {
+                    "generation": session["generation"],
+                    "age": round(now - session["refreshed"], 1),
+                    "refreshing": index in self._grants,
+                }
+                for index, session in self.sessions.items()
+            },
+        }
+
+
+class BrokerClient:
+    # A worker's connection to the broker. Calls are pipelined over a single
+    # socket and matched to replies by id. While the broker can't be reached
+    # calls raise BrokerUnavailable straight away (reconnecting at most once
+    # a second) so callers can fall back to local state.
+
+    def __init__(self, path, retry_interval=1.0):
+        self.path = path
+        self.retry_interval = retry_interval
+        self.failures = 0
+        self._writer = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._connecting = None
+        self._retry_at = 0.0
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _connect(self):
+        if time.monotonic() < self._retry_at:
+            raise BrokerUnavailable(f"broker at {self.path} unavailable")
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.path, limit=MAX_LINE)
+        except OSError as e:
+            self.failures += 1
+            self._retry_at = time.monotonic() + self.retry_interval
+            raise BrokerUnavailable(f"broker at {self.path} unavailable: {e}") from e
+        self._writer = writer
+        asyncio.ensure_future(self._read(reader, writer))
+
+    async def _ensure(self):
+        if self.connected:
+            return
+        # Concurrent callers share one connection attempt
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._connect())
+            self._connecting.add_done_callback(lambda _: setattr(self, "_connecting", None))
+        await asyncio.shield(self._connecting)
+
+    async def _read(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                msg = orjson.loads(line)
+                future = self._pending.pop(msg.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if msg.get("error") is not None:
+                    future.set_exception(BrokerError(msg["error"]))
+                else:
+                    future.set_result(msg.get("result"))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if self._writer is writer:
+                self._writer = None
+            writer.close()
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(BrokerUnavailable("connection to broker lost"))
+
+    async def call(self, op, **args):
+        await self._ensure()
+        msg_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = future
+        self._writer.write(orjson.dumps({"id": msg_id, "op": op, "args": args}) + b"\n")
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Don't leave the broker holding a token for a caller that's gone
+            self._pending.pop(msg_id, None)
+            self.notify("cancel", ref=msg_id)
+            raise
+
+    def notify(self, op, ref=None, **args):
+        # Fire and forget; dropped if not connected
+        if not self.connected:
+            return
+        msg = {"op": op, "args": args}
+        if ref is not None:
+            msg["ref"] = ref
+        self._writer.write(orjson.dumps(msg) + b"\n")
+
+    async def aclose(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class BrokerRateLimiter:
+    # RateLimiter interface backed by the broker's global buckets. If the
+    # broker is down, `fallback` (a local RateLimiter, normally configured
+    # with this worker's share of the budget) takes over.
+
+    def __init__(self, client, fallback):
+        self.client = client
+        self.fallback = fallback
+        self.acquired = 0
+        self.fallbacks = 0
+        self.wait_time = 0.0
+
+    async def acquire(self, host, priority=None, identity=None):
+        if priority is None:
+            priority = request_priority.get()
+        self.acquired += 1
+        start = time.monotonic()
+        try:
+            await self.client.call("acquire", host=host, identity=identity, priority=priority)
+        except BrokerUnavailable:
+            self.fallbacks += 1
+            return await self.fallback.acquire(host, priority, identity)
+        waited = time.monotonic() - start
+        self.wait_time += waited
+        return waited
+
+    def backoff(self, host, identity=None, retry_after=None):
+        self.fallback.backoff(host, identity, retry_after)
+        self.client.notify("backoff", host=host, identity=identity, retry_after=retry_after)
+
+    def recover(self, host, identity=None):
+        self.fallback.recover(host, identity)
+        self.client.notify("recover", host=host, identity=identity)
+
+    def spare(self, host):
+        # Only the broker knows; callers fall back to priorities alone
+        return None
+
+    def stats(self):
+        # Global bucket state is at /broker/stats; this is the worker's view
+        return {
+            "broker": self.client.path,
+            "connected": self.client.connected,
+            "acquired": self.acquired,
+            "wait_time_total": round(self.wait_time, 3),
+            "fallback_acquires": self.fallbacks,
+            "fallback": self.fallback.stats(),
+        }
+
+
+class BrokerBackend:
+    # ResponseCache tier stored in the broker, so a response fetched by one
+    # worker is a hit for the others. Lookups go over the worker's
+    # BrokerClient, so ResponseCache only reaches them through its async
+    # methods, batched into one round trip per call; stores
+    # are fire-and-forget. Put a MemoryBackend in front of it. Failures
+    # count as misses.
+    name = "broker"
+    remote = True
+
+    def __init__(self, client):
+        self.client = client
+        self.max_entries = None
+        self.evictions = 0
+        self.entries = 0  # as of the last refresh()
+        self.errors = 0
+
+    async def aget_many(self, keys):
+        try:
+            entries = await self.client.call("cache_get", keys=keys)
+        except (BrokerUnavailable, BrokerError):
+            self.errors += 1
+            return [None] * len(keys)
+        return [tuple(entry) if entry else None for entry in entries]
+
+    def set(self, key, value, expires):
+        self.client.notify("cache_set", key=key, value=value, expires=expires)
+
+    async def refresh(self):
+        try:
+            info = await self.client.call("cache_info")
+        except (BrokerUnavailable, BrokerError):
+            self.errors += 1
+            return
+        self.entries = info["entries"]
+        self.max_entries = info["max_entries"]
+        self.evictions = info["evictions"]
+
+    def __len__(self):
+        return self.entries
+
+
+class SharedSessions:
+    # Crumb/cookie exchange for SessionPool(shared=...)
+
+    def __init__(self, client):
+        self.client = client
+
+    async def claim(self, index, stale_crumb=None):
+        # {"session": {...}} to adopt, or {"grant": token} to go and refresh
+        return await self.client.call("session_claim", index=index, stale_crumb=stale_crumb)
+
+    async def publish(self, index, crumb, cookies):
+        return await self.client.call("session_publish", index=index, crumb=crumb, cookies=cookies)
+
+    async def release(self, index, token):
+        return await self.client.call("session_release", index=index, token=token)
+
+
+async def serve(args, uvicorn_args):
+    limiter = RateLimiter(rate=1.0 / args.rate_limit, burst=args.burst)
+    broker = Broker(limiter, cache_size=args.cache_size)
+    server = await broker.start(args.socket)
+    print(f"broker listening on {args.socket}", file=sys.stderr)
+    try:
+        if not args.workers:
+            await server.serve_forever()
+            return 0
+        env = dict(os.environ, YAHOO_BROKER=args.socket, YAHOO_WORKERS=str(args.workers))
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "uvicorn", "main:app", "--workers", str(args.workers), *uvicorn_args,
+            env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, proc.terminate)
+        return await proc.wait()
+    finally:
+        server.close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coordination broker for multi-worker deployments")
+    parser.add_argument("--socket", default=os.environ.get("YAHOO_BROKER", "/tmp/yahoo-broker.sock"))
+    parser.add_argument("--workers", type=int, default=0, help="also run uvicorn with this many workers")
+    parser.add_argument("--rate-limit", type=float, default=float(os.environ.get("YAHOO_RATE_LIMIT", "1.2")),
+                        help="seconds between requests, per host and session, across all workers")
+    parser.add_argument("--burst", type=int, default=int(os.environ.get("YAHOO_RATE_BURST", "3")))
+    parser.add_argument("--cache-size", type=int, default=int(os.environ.get("YAHOO_BROKER_CACHE_SIZE", "50000")))
+    argv = sys.argv[1:]
+    # Anything after "--" goes to uvicorn
+    uvicorn_args = argv[argv.index("--") + 1:] if "--" in argv else []
+    args = parser.parse_args(argv[:argv.index("--")] if "--" in argv else argv)
+    sys.exit(asyncio.run(serve(args, uvicorn_args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by ResponseCache.get when there is no fresh entry (None is a valid value)
+MISS = object()
+
+
+class MemoryBackend:
+    name = "memory"
+    remote = False
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def set(self, key, value, expires):
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    # On-disk tier: survives restarts and holds far more entries than memory.
+    # Values are stored as JSON, so only JSON-compatible data can be cached.
+    name = "sqlite"
+    remote = False
+
+    def __init__(self, path, max_entries=200000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, expires REAL, accessed REAL, value TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT expires, value FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (time.time(), key))
+        return row[0], json.loads(row[1])
+
+    def set(self, key, value, expires):
+        data = json.dumps(value, separators=(",", ":"))
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE cache SET expires = ?, accessed = ?, value = ? WHERE key = ?",
+                (expires, now, data, key),
+            )
+            if cur.rowcount == 0:
+                self._conn.execute(
+                    "INSERT INTO cache (key, expires, accessed, value) VALUES (?, ?, ?, ?)",
+                    (key, expires, now, data),
+                )
+                self._count += 1
+            if self._count > self.max_entries:
+                excess = self._count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                    (excess,),
+                )
+                self._count -= excess
+                self.evictions += excess
+
+    def __len__(self):
+        return self._count
+
+
+class ResponseCache:
+    # Tiered TTL cache keyed on (method, ticker, params). Backends are checked
+    # in order (fastest first) and a hit in a slower tier is copied upwards.
+    # Remote backends (remote = True) are only asked through aget/aget_many/
+    # aget_stale, which await their `aget_many(keys)`; get/get_stale look at
+    # local tiers only.
+
+    def __init__(self, backends=None):
+        self.backends = backends or [MemoryBackend()]
+        self.hits = 0
+        self.misses = 0
+        self.tier_hits = {backend.name: 0 for backend in self.backends}
+
+    def _key(self, method, ticker, params):
+        return json.dumps([method, ticker, params], separators=(",", ":"), sort_keys=True)
+
+    def _hit(self, key, i, backend, entry):
+        self.hits += 1
+        self.tier_hits[backend.name] += 1
+        for faster in self.backends[:i]:
+            if not faster.remote:
+                faster.set(key, entry[1], entry[0])
+        return entry[1]
+
+    def get(self, method, ticker=None, params=None):
+        key = self._key(method, ticker, params)
+        now = time.time()
+        for i, backend in enumerate(self.backends):
+            if backend.remote:
+                continue
+            entry = backend.get(key)
+            if entry is not None and entry[0] > now:
+                return self._hit(key, i, backend, entry)
+        self.misses += 1
+        return MISS
+
+    async def aget(self, method, ticker=None, params=None):
+        return (await self.aget_many(method, [(ticker, params)]))[0]
+
+    async def aget_many(self, method, lookups):
+        # [(ticker, params)] -> [value or MISS]; one round trip per remote tier
+        keys = [self._key(method, ticker, params) for ticker, params in lookups]
+        values = [MISS] * len(keys)
+        pending = list(range(len(keys)))
+        for i, backend in enumerate(self.backends):
+            if not pending:
+                break
+            if backend.remote:
+                entries = await backend.aget_many([keys[j] for j in pending])
+            else:
+                entries = [backend.get(keys[j]) for j in pending]
+            now = time.time()
+            missed = []
+            for j, entry in zip(pending, entries):
+                if entry is not None and entry[0] > now:
+                    values[j] = self._hit(keys[j], i, backend, entry)
+                else:
+                    missed.append(j)
+            pending = missed
+        self.misses += len(pending)
+        return values
+
+    def get_stale(self, method, ticker=None, params=None, max_stale=None):
+        # Fallback for when upstream is failing: the entry even if it has
+        # expired, as long as it expired less than max_stale seconds ago
+        key = self._key(method, ticker, params)
+        now = time.time()
+        for backend in self.backends:
+            if backend.remote:
+                continue
+            entry = backend.get(key)
+            if entry is not None and (max_stale is None or entry[0] + max_stale > now):
+                return entry[1]
+        return MISS
+
+    async def aget_stale(self, method, ticker=None, params=None, max_stale=None):
+        key = self._key(method, ticker, params)
+        for backend in self.backends:
+            entry = (await backend.aget_many([key]))[0] if backend.remote else backend.get(key)
+            if entry is not None and (max_stale is None or entry[0] + max_stale > time.time()):
+                return entry[1]
+        return MISS
+
+    def set(self, method, ticker, params, value, ttl):
+        key = self._key(method, ticker, params)
+        expires = time.time() + ttl
+        for backend in self.backends:
+            backend.set(key, value, expires)
+
+    async def astats(self):
+        # stats() with up-to-date sizes for remote tiers
+        for backend in self.backends:
+            if backend.remote:
+                await backend.refresh()
+        return self.stats()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": sum(backend.evictions for backend in self.backends),
+            "tiers": {
+                backend.name: {
+                    "entries": len(backend),
+                    "max_entries": backend.max_entries,
+                    "hits": self.tier_hits[backend.name],
+                    "evictions": backend.evictions,
+                }
+                for backend in self.backends
+            },
+        }
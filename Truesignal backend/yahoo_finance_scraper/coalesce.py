@@ -0,0 +1,97 @@
+import asyncio
+
+
+class _Batch:
+    def __init__(self, loop):
+        self.modules = []
+        self.future = loop.create_future()
+
+
+class ModuleCoalescer:
+    # Merges module requests for the same key (ticker) that arrive within
+    # `window` seconds into one upstream fetch, then hands each caller back
+    # only the modules it asked for. If the merged fetch fails with one of
+    # `rejected` (upstream refusing the request itself, say over a bad
+    # module), each caller retries with just its own modules, so one bad
+    # request doesn't fail the others.
+
+    def __init__(self, fetch, window=0.05, rejected=()):
+        self.fetch = fetch  # async (key, modules) -> {module: data}
+        self.window = window
+        self.rejected = rejected
+        self._pending = {}
+        self._tasks = set()
+        self.upstream_calls = 0
+        self.merged_requests = 0
+        self.split_retries = 0
+
+    async def get(self, key, modules):
+        batch = self._pending.get(key)
+        if batch is None:
+            loop = asyncio.get_running_loop()
+            batch = _Batch(loop)
+            self._pending[key] = batch
+            loop.call_later(self.window, self._flush, key, batch)
+        else:
+            self.merged_requests += 1
+        for module in modules:
+            if module not in batch.modules:
+                batch.modules.append(module)
+        try:
+            # Shielded so one cancelled caller doesn't cancel the shared fetch
+            result = await asyncio.shield(batch.future)
+        except self.rejected:
+            if set(modules) == set(batch.modules):
+                raise
+            self.split_retries += 1
+            self.upstream_calls += 1
+            result = await self.fetch(key, list(modules)) or {}
+        return {m: result[m] for m in modules if m in result}
+
+    def _flush(self, key, batch):
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+        self.upstream_calls += 1
+        task = asyncio.ensure_future(self._run(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key, batch):
+        try:
+            result = await self.fetch(key, list(batch.modules))
+        except asyncio.CancelledError:
+            batch.future.cancel()
+            raise
+        except Exception as e:
+            batch.future.set_exception(e)
+            # Mark it retrieved: every caller may already have given up
+            batch.future.exception()
+        else:
+            batch.future.set_result(result or {})
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share one in-flight fetch and all
+    # receive its result (or its exception).
+
+    def __init__(self):
+        self._inflight = {}
+        self.shared = 0
+
+    async def do(self, key, fetch):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.shared += 1
+        # Shielded so one cancelled caller doesn't cancel the shared fetch
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark it retrieved: every caller may already have given up
+            task.exception()
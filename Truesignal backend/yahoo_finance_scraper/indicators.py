@@ -0,0 +1,210 @@
+import inspect
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Bars per year, for annualising volatility; other intervals stay per-bar
+PERIODS_PER_YEAR = {"1d": 252, "5d": 50.4, "1wk": 52, "1mo": 12, "3mo": 4}
+
+
+def _pad(values, length):
+    # Left-pad a rolling result with NaN so it lines up with its input
+    out = np.full(length, np.nan)
+    if len(values):
+        out[length - len(values):] = values
+    return out
+
+
+def rolling_mean(x, n):
+    if len(x) < n:
+        return np.full(len(x), np.nan)
+    c = np.cumsum(np.concatenate(([0.0], x)))
+    return _pad((c[n:] - c[:-n]) / n, len(x))
+
+
+def rolling_std(x, n):
+    if len(x) < n:
+        return np.full(len(x), np.nan)
+    return _pad(sliding_window_view(x, n).std(axis=1), len(x))
+
+
+def ema(x, alpha, init=None):
+    # y[t] = (1 - alpha) * y[t-1] + alpha * x[t], with y[-1] = init (or
+    # y[0] = x[0] without one). Evaluated in closed form per block:
+    #   y[j] = d^(j+1) * carry + alpha * d^j * cumsum(x[i] * d^-i),  d = 1 - alpha
+    # with blocks short enough that d^-i stays well inside float precision.
+    x = np.asarray(x, dtype=np.float64)
+    out = np.empty(len(x))
+    if not len(x):
+        return out
+    if alpha >= 1:
+        out[:] = x
+        return out
+    decay = 1.0 - alpha
+    block = max(1, min(len(x), int(12 / -np.log10(decay))))
+    steps = np.arange(block)
+    grow = decay ** -steps
+    shrink = decay ** steps
+    start = 0
+    carry = init
+    if carry is None:
+        out[0] = carry = x[0]
+        start = 1
+    for s in range(start, len(x), block):
+        chunk = x[s:s + block]
+        m = len(chunk)
+        out[s:s + m] = shrink[:m] * decay * carry + alpha * shrink[:m] * np.cumsum(chunk * grow[:m])
+        carry = out[s + m - 1]
+    return out
+
+
+def wilder(x, n):
+    # Wilder's smoothing: seeded with the mean of the first n values
+    out = np.full(len(x), np.nan)
+    if len(x) < n:
+        return out
+    out[n - 1] = seed = x[:n].mean()
+    out[n:] = ema(x[n:], 1.0 / n, init=seed)
+    return out
+
+
+def sma(bars, n=20):
+    return rolling_mean(bars["close"], int(n))
+
+
+def ema_close(bars, n=20):
+    n = int(n)
+    out = ema(bars["close"], 2.0 / (n + 1))
+    out[:n - 1] = np.nan
+    return out
+
+
+def rsi(bars, n=14):
+    n = int(n)
+    delta = np.diff(bars["close"])
+    gains = wilder(np.clip(delta, 0, None), n)
+    losses = wilder(np.clip(-delta, 0, None), n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = np.where(losses == 0, 100.0, 100.0 - 100.0 / (1.0 + gains / losses))
+    value[np.isnan(gains)] = np.nan
+    return np.concatenate(([np.nan], value))
+
+
+def macd(bars, fast=12, slow=26, signal=9):
+    close = bars["close"]
+    line = ema(close, 2.0 / (int(fast) + 1)) - ema(close, 2.0 / (int(slow) + 1))
+    line[:int(slow) - 1] = np.nan
+    sig = np.full(len(close), np.nan)
+    valid = int(slow) - 1
+    if len(close) > valid:
+        sig[valid:] = ema(line[valid:], 2.0 / (int(signal) + 1))
+        sig[:valid + int(signal) - 1] = np.nan
+    return {"macd": line, "signal": sig, "hist": line - sig}
+
+
+def bbands(bars, n=20, k=2):
+    n = int(n)
+    middle = rolling_mean(bars["close"], n)
+    width = float(k) * rolling_std(bars["close"], n)
+    return {"upper": middle + width, "middle": middle, "lower": middle - width}
+
+
+def atr(bars, n=14):
+    high, low, close = bars["high"], bars["low"], bars["close"]
+    previous = np.concatenate(([close[0]], close[:-1])) if len(close) else close
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - previous), np.abs(low - previous)))
+    return wilder(true_range, int(n))
+
+
+def returns(bars, n=1):
+    n = int(n)
+    close = bars["close"]
+    out = np.full(len(close), np.nan)
+    if len(close) > n:
+        out[n:] = close[n:] / close[:-n] - 1.0
+    return out
+
+
+def volatility(bars, n=20, interval="1d"):
+    # Rolling standard deviation of log returns, annualised when the interval allows
+    close = bars["close"]
+    log_returns = np.concatenate(([np.nan], np.diff(np.log(close)))) if len(close) else close
+    out = np.full(len(close), np.nan)
+    if len(close) > 1:
+        out[1:] = rolling_std(log_returns[1:], int(n))
+    return out * np.sqrt(PERIODS_PER_YEAR.get(interval, 1.0))
+
+
+# name -> (function, columns it needs)
+INDICATORS = {
+    "sma": (sma, ("close",)),
+    "ema": (ema_close, ("close",)),
+    "rsi": (rsi, ("close",)),
+    "macd": (macd, ("close",)),
+    "bbands": (bbands, ("close",)),
+    "atr": (atr, ("high", "low", "close")),
+    "returns": (returns, ("close",)),
+    "volatility": (volatility, ("close",)),
+}
+
+
+# Parameters that are multipliers rather than bar counts
+FLOAT_PARAMS = {"k"}
+
+
+def _parameters(function):
+    # Names of the spec parameters a function takes (after bars, before interval)
+    names = list(inspect.signature(function).parameters)[1:]
+    return [name for name in names if name != "interval"]
+
+
+def parse_specs(text):
+    # "sma:20,rsi,macd:12:26:9" -> [("sma:20", "sma", [20]), ...]
+    specs = []
+    for raw in text.split(","):
+        raw = raw.strip().lower()
+        if not raw:
+            continue
+        name, *params = raw.split(":")
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator {name!r}; available: {', '.join(INDICATORS)}")
+        names = _parameters(INDICATORS[name][0])
+        if len(params) > len(names):
+            raise ValueError(f"{name} takes at most {len(names)} parameter(s) ({':'.join(names)}): {raw!r}")
+        values = []
+        for param, value in zip(names, params):
+            try:
+                number = float(value) if param in FLOAT_PARAMS else int(value)
+            except ValueError:
+                kind = "a number" if param in FLOAT_PARAMS else "a whole number of bars"
+                raise ValueError(f"{name} {param} must be {kind}: {raw!r}")
+            if not number > 0:
+                raise ValueError(f"{name} {param} must be positive: {raw!r}")
+            values.append(number)
+        specs.append((raw, name, values))
+    return specs
+
+
+def _tail(values, tail):
+    values = values[-tail:] if tail else values
+    out = [None if v != v else round(v, 6) for v in values.tolist()]
+    return out[-1] if tail == 1 else out
+
+
+def compute(series, specs, tail=1, interval="1d"):
+    # Indicators over a PriceSeries; bars with a missing value in any
+    # column an indicator needs are dropped first
+    results = {}
+    for label, name, params in specs:
+        function, needs = INDICATORS[name]
+        valid = np.ones(len(series), dtype=bool)
+        for column in needs:
+            valid &= ~np.isnan(series.columns[column])
+        bars = {column: series.columns[column][valid] for column in needs}
+        kwargs = {"interval": interval} if name == "volatility" else {}
+        value = function(bars, *params, **kwargs)
+        if isinstance(value, dict):
+            results[label] = {key: _tail(v, tail) for key, v in value.items()}
+        else:
+            results[label] = _tail(value, tail)
+    return results
@@ -1,17 +1,92 @@
+import os
+import json
 import time
 import random
 import re
-from urllib.parse import quote
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote, urlsplit
 
-import requests
-from fastapi import FastAPI, Query, HTTPException
-from fastapi.responses import JSONResponse
+import httpx
+from fastapi import FastAPI, Query, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from bs4 import BeautifulSoup
+from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 
-app = FastAPI(title="Yahoo Finance Scraper API", version="1.2")
+from breaker import CircuitBreaker, CircuitOpenError
+from broker import BrokerBackend, BrokerClient, BrokerRateLimiter, SharedSessions
+from cache import MISS, MemoryBackend, ResponseCache, SQLiteBackend
+from news import NewsDeduper, headline_numbers
+from newsparse import NewsPageParser
+import indicators
+import metrics
+from barstore import BarStore, range_start
+from series import SERIES_FORMATS, PriceSeries
+from snapshots import SNAPSHOT_MODULES, FundamentalsTable, SnapshotRefresher
+from coalesce import ModuleCoalescer, SingleFlight
+from sessions import SessionPool
+from streaming import QuoteMultiplexer
+from symbols import SymbolIndex, search_item
+from prefetch import Dataset, Prefetcher
+from ratelimit import PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, RateLimiter, request_priority
 
-class YahooFinanceScraper:
+# Exposed at /metrics
+registry = metrics.Registry()
+REQUEST_SECONDS = registry.histogram("yahoo_api_request_seconds", "Time to answer an API request", ["endpoint", "status"])
+UPSTREAM_SECONDS = registry.histogram("yahoo_upstream_request_seconds", "Yahoo response time, per API", ["api"])
+UPSTREAM_REQUESTS = registry.counter("yahoo_upstream_requests_total", "Yahoo requests by API and HTTP status", ["api", "status"])
+THROTTLE_SECONDS = registry.histogram("yahoo_throttle_wait_seconds", "Time spent waiting on the rate limiter", ["host"])
+PARSE_SECONDS = registry.histogram("yahoo_parse_seconds", "Time spent decoding upstream responses", ["kind"])
+DIGEST_SECONDS = registry.histogram("yahoo_news_digest_seconds", "Time spent deduplicating and tagging headlines")
+CACHE_LOOKUPS = registry.counter("yahoo_cache_lookups_total", "Response cache lookups", ["method", "result"])
+CRUMB_REFRESHES = registry.counter("yahoo_crumb_refreshes_total", "Session/crumb re-inits triggered by requests", ["reason"])
+RETRIES = registry.counter("yahoo_upstream_retries_total", "Upstream requests retried after a 429, 5xx or network error", ["api"])
+CIRCUIT_OPENED = registry.counter("yahoo_circuit_opened_total", "Times a host's circuit breaker opened", ["host"])
+STALE_SERVED = registry.counter("yahoo_stale_served_total", "Expired cache entries served because upstream failed", ["method"])
+SWALLOWED_ERRORS = registry.counter("yahoo_swallowed_errors_total", "Exceptions turned into empty responses", ["endpoint", "error"])
+
+# API route of the request being served, for labelling swallowed errors
+current_endpoint = contextvars.ContextVar("current_endpoint", default="")
+
+def record_swallowed(e):
+    SWALLOWED_ERRORS.inc(endpoint=current_endpoint.get() or "background", error=type(e).__name__)
+
+def _retry_after(resp):
+    # Seconds from a Retry-After header (delta or HTTP date), or None
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class UpstreamRejected(Exception):
+    # Yahoo answered with a 4xx other than 401/429: retrying the same request won't help
+    pass
+
+def _quote_symbols(tickers):
+    # Requested ticker -> the upper-case symbol it's cached and fetched as
+    return {ticker: ticker.strip().upper() for ticker in tickers if ticker and ticker.strip()}
+
+def _by_request(symbols, quotes):
+    # Quotes keyed back by the tickers as requested; results Yahoo returned
+    # under a symbol nobody asked for keep their own key
+    result = {ticker: quotes[symbol] for ticker, symbol in symbols.items() if symbol in quotes}
+    requested = set(symbols.values())
+    result.update((symbol, quote) for symbol, quote in quotes.items() if symbol not in requested)
+    return result
+
+class YahooParsing:
+    # Yahoo endpoints and the request/response shapes around them, free of
+    # any I/O; mixed into AsyncYahooFinanceScraper
     BASE_QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
     BASE_SEARCH_URL = "https://query1.finance.yahoo.com/v1/finance/search"
     BASE_CHART_URL = "https://query2.finance.yahoo.com/v8/finance/chart"
@@ -23,29 +98,6 @@ class YahooFinanceScraper:
         "Chrome/124.0.0.0 Safari/537.36"
     )
 
-    def __init__(self, rate_limit=1.0):
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": self.USER_AGENT,
-            "Accept-Language": "en-US,en;q=0.9",
-            "Connection": "keep-alive",
-        })
-        self.crumb = None
-        self.cookies = None
-        self.rate_limit = rate_limit  # seconds between requests
-        self.last_request_time = 0
-        self._init_session()
-
-    def _init_session(self):
-        resp = self.session.get("https://finance.yahoo.com/quote/AAPL")
-        if self._is_consent_page(resp.text):
-            self._accept_consent()
-            resp = self.session.get("https://finance.yahoo.com/quote/AAPL")
-        self.cookies = resp.cookies.get_dict()
-        self.crumb = self._get_crumb_from_html(resp.text)
-        if not self.crumb:
-            raise Exception("Failed to obtain Yahoo Finance crumb token.")
-
     def _is_consent_page(self, html):
         return (
             "guce.yahoo.com" in html or
@@ -54,18 +106,11 @@ class YahooFinanceScraper:
             ("consent" in html.lower() and "privacy" in html.lower())
         )
 
-    def _accept_consent(self):
-        consent_url = "https://guce.yahoo.com/consent"
-        params = {
-            "brandType": "nonEu",
-            "gcrumb": "",
-            "done": "https://finance.yahoo.com"
-        }
-        resp = self.session.get(consent_url, params=params)
-        soup = BeautifulSoup(resp.text, "lxml")
+    def _parse_consent_form(self, html):
+        soup = BeautifulSoup(html, "lxml")
         form = soup.find("form")
         if not form:
-            return
+            return None, {}
         action = form.get("action")
         inputs = form.find_all("input")
         data = {}
@@ -74,10 +119,9 @@ class YahooFinanceScraper:
             value = inp.get("value", "")
             if name:
                 data[name] = value
-        if action:
-            if not action.startswith("http"):
-                action = "https://guce.yahoo.com" + action
-            self.session.post(action, data=data)
+        if action and not action.startswith("http"):
+            action = "https://guce.yahoo.com" + action
+        return action, data
 
     def _get_crumb_from_html(self, html):
         m = re.search(r'"CrumbStore":\{"crumb":"(.*?)"\}', html)
@@ -92,54 +136,20 @@ class YahooFinanceScraper:
             return crumb
         return None
 
-    def _throttle(self):
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.rate_limit:
-            time.sleep(self.rate_limit - elapsed + random.uniform(0, 0.3))
-        self.last_request_time = time.time()
-
-    def _request(self, url, params=None, require_crumb=False, allow_retry=True):
-        self._throttle()
-        cookies = self.cookies
-        if require_crumb:
-            if not self.crumb:
-                self._init_session()
-            if params is None:
-                params = {}
-            params['crumb'] = self.crumb
-        try:
-            resp = self.session.get(url, params=params, cookies=cookies, timeout=10)
-            if resp.status_code == 401 and allow_retry:
-                self._init_session()
-                return self._request(url, params, require_crumb, allow_retry=False)
-            resp.raise_for_status()
-            return resp
-        except Exception as e:
-            raise Exception(f"Request failed: {url} ({e})")
-
-    def get_realtime_quotes(self, tickers):
-        url = self.BASE_QUOTE_URL
-        params = {
+    def _quote_params(self, tickers):
+        return {
             "symbols": ",".join(tickers),
             "lang": "en-US",
             "region": "US"
         }
-        resp = self._request(url, params=params, require_crumb=True)
-        data = resp.json()
+
+    def _parse_quotes(self, data):
         if "quoteResponse" in data and "result" in data["quoteResponse"]:
             return {item['symbol']: item for item in data["quoteResponse"]["result"]}
         else:
             return {}
 
-    def search_ticker(self, query):
-        url = self.BASE_SEARCH_URL
-        params = {"q": query, "lang": "en-US", "region": "US"}
-        resp = self._request(url, params=params)
-        data = resp.json()
-        return data.get("quotes", [])
-
-    def get_historical_prices(self, ticker, interval="1d", range_="1y", events=None, period1=None, period2=None):
-        url = f"{self.BASE_CHART_URL}/{quote(ticker)}"
+    def _history_params(self, interval="1d", range_="1y", events=None, period1=None, period2=None):
         params = {
             "interval": interval,
         }
@@ -150,257 +160,1086 @@ class YahooFinanceScraper:
             params["range"] = range_
         if events:
             params["events"] = events
-        resp = self._request(url, params=params, require_crumb=True)
-        data = resp.json()
+        return params
+
+    def _parse_chart(self, data):
         if "chart" in data and "result" in data["chart"] and data["chart"]["result"]:
             return data["chart"]["result"][0]
         else:
             return {}
 
-    def get_fundamentals(self, ticker, modules):
-        url = f"{self.BASE_QUOTE_SUMMARY_URL}/{quote(ticker)}"
-        params = {
-            "modules": ",".join(modules),
-            "formatted": "true"
-        }
-        resp = self._request(url, params=params, require_crumb=True)
-        data = resp.json()
+    def _parse_quote_summary(self, data):
         if "quoteSummary" in data and "result" in data["quoteSummary"] and data["quoteSummary"]["result"]:
             return data["quoteSummary"]["result"][0]
         else:
             return {}
 
-    def get_financial_statements(self, ticker, statement_type="incomeStatementHistory", quarterly=False):
+    def _statement_module(self, statement_type, quarterly):
         if quarterly:
             statement_type += "Quarterly"
-        modules = [statement_type]
-        data = self.get_fundamentals(ticker, modules)
+        return statement_type
+
+    def _parse_statements(self, data, statement_type):
         return data.get(statement_type, {}).get(statement_type.replace("History", "Statements"), [])
 
-    def get_company_profile(self, ticker):
+class AsyncYahooFinanceScraper(YahooParsing):
+    # Every upstream call goes through pooled httpx.AsyncClient sessions, so
+    # concurrent API requests overlap instead of queueing on a blocking session.
+
+    # quoteSummary modules behind /fundamentals (by default), /analyst and /calendar
+    FUNDAMENTALS_MODULES = ["summaryDetail", "defaultKeyStatistics", "financialData"]
+    ANALYST_MODULES = ["earningsTrend", "earningsHistory", "earnings", "recommendationTrend", "upgradeDowngradeHistory"]
+    CALENDAR_MODULES = ["calendarEvents"]
+
+    # Seconds each kind of data stays fresh in the response cache
+    CACHE_TTLS = {
+        "quote": 5,
+        "search": 3600,
+        "chart_intraday": 60,
+        "chart": 900,
+        "news": 300,
+        "quoteSummary": 300,
+    }
+    MODULE_TTLS = {
+        "assetProfile": 6 * 3600,
+        "summaryProfile": 6 * 3600,
+        "fundProfile": 6 * 3600,
+        "topHoldings": 6 * 3600,
+        "majorHoldersBreakdown": 6 * 3600,
+        "insiderHolders": 6 * 3600,
+        "institutionOwnership": 6 * 3600,
+        "fundOwnership": 6 * 3600,
+        "calendarEvents": 3600,
+        "earningsTrend": 3600,
+        "earningsHistory": 3600,
+        "earnings": 3600,
+        "recommendationTrend": 3600,
+        "upgradeDowngradeHistory": 3600,
+        "incomeStatementHistory": 24 * 3600,
+        "incomeStatementHistoryQuarterly": 24 * 3600,
+        "balanceSheetHistory": 24 * 3600,
+        "balanceSheetHistoryQuarterly": 24 * 3600,
+        "cashflowStatementHistory": 24 * 3600,
+        "cashflowStatementHistoryQuarterly": 24 * 3600,
+    }
+
+    def __init__(self, rate_limit=1.0, max_connections=20, max_keepalive_connections=10, http2=True, timeout=10,
+                 coalesce_window=0.05, cache=None, burst=3, host_limits=None, sessions=1, session_max_age=1800,
+                 transport=None, bars=None, news_parser="lxml", max_retries=2, retry_base=0.5, retry_cap=8.0,
+                 breaker_threshold=5, breaker_reset=30.0, max_stale=86400, symbols=None, broker=None, workers=1,
+                 snapshots=None):
+        self.rate_limit = rate_limit  # steady-state seconds between requests, per upstream host and session
+        # host -> (requests per second, burst); hosts not listed use rate_limit/burst
+        self.limiter = RateLimiter(rate=1.0 / rate_limit, burst=burst, host_limits=host_limits)
+        # With a broker (BrokerClient), the `workers` processes behind it share
+        # its buckets and sessions; if it goes away each worker falls back to
+        # throttling locally at its share of the budget
+        self.broker = broker
+        if broker is not None:
+            fallback = RateLimiter(rate=1.0 / (rate_limit * workers), burst=burst, host_limits={
+                host: (rate / workers, host_burst) for host, (rate, host_burst) in (host_limits or {}).items()
+            })
+            self.limiter = BrokerRateLimiter(broker, fallback)
+        self.max_connections = max_connections  # per session
+        self.max_keepalive_connections = max_keepalive_connections
+        self.http2 = http2
+        self.timeout = timeout
+        self.transport = transport
+        # Each session is a separate Yahoo identity with its own rate budget,
+        # so throughput scales with the pool size
+        self.sessions = SessionPool(self._make_client, self._init_session, size=sessions, max_age=session_max_age,
+                                    shared=SharedSessions(broker) if broker is not None else None)
+        # quoteSummary takes any number of modules, so concurrent module
+        # requests for one ticker share a single upstream call
+        self._summary = ModuleCoalescer(self._fetch_quote_summary, window=coalesce_window, rejected=(UpstreamRejected,))
+        self.cache = cache if cache is not None else ResponseCache()
+        # Identical concurrent cache misses share one upstream fetch
+        self._inflight = SingleFlight()
+        self.bars = bars if bars is not None else BarStore()
+        self.news_parser = news_parser
+        # 429/5xx/network errors are retried with capped exponential backoff
+        # and full jitter (or whatever Retry-After asks for)
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_cap = retry_cap
+        # Per-host breakers fail fast while Yahoo is down or throttling us;
+        # meanwhile cached data up to max_stale seconds past expiry is served
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.breakers = {}
+        self.max_stale = max_stale
+        # Symbols seen in search results and quotes, so lookups can skip upstream
+        self.symbols = symbols if symbols is not None else SymbolIndex()
+        # Flattened fundamentals per ticker for /screen (snapshots.FundamentalsTable)
+        self.snapshots = snapshots
+
+    async def _cache_get(self, method, ticker=None, params=None):
+        return (await self._cache_get_many(method, [(ticker, params)]))[0]
+
+    async def _cache_get_many(self, method, lookups):
+        values = await self.cache.aget_many(method, lookups)
+        for value in values:
+            CACHE_LOOKUPS.inc(method=method, result="miss" if value is MISS else "hit")
+        return values
+
+    async def _cached(self, method, ticker, params, ttl, fetch, refresh=False):
+        # refresh=True skips the lookup and replaces the entry (cache warming)
+        if not refresh:
+            value = await self._cache_get(method, ticker, params)
+            if value is not MISS:
+                return value
+
+        async def fetch_and_store():
+            value = await fetch()
+            # Empty results are usually a swallowed upstream failure; don't pin them
+            if value:
+                self.cache.set(method, ticker, params, value, ttl)
+            return value
+
+        try:
+            return await self._inflight.do((method, ticker, repr(params)), fetch_and_store)
+        except Exception:
+            stale = await self._stale(method, ticker, params)
+            if stale is MISS:
+                raise
+            return stale
+
+    async def _stale(self, method, ticker=None, params=None):
+        value = await self.cache.aget_stale(method, ticker, params, max_stale=self.max_stale)
+        if value is not MISS:
+            STALE_SERVED.inc(method=method)
+        return value
+
+    def _make_client(self):
+        return httpx.AsyncClient(
+            headers={
+                "User-Agent": self.USER_AGENT,
+                "Accept-Language": "en-US,en;q=0.9",
+            },
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+            ),
+            timeout=self.timeout,
+            follow_redirects=True,
+            transport=self.transport,
+        )
+
+    def start(self):
+        # Warm the session pool in the background so startup doesn't block on Yahoo
+        self.sessions.start()
+
+    async def aclose(self):
+        await self.sessions.aclose()
+        if self.broker is not None:
+            await self.broker.aclose()
+
+    async def _init_session(self, client):
+        resp = await client.get("https://finance.yahoo.com/quote/AAPL")
+        if self._is_consent_page(resp.text):
+            await self._accept_consent(client)
+            resp = await client.get("https://finance.yahoo.com/quote/AAPL")
+        crumb = self._get_crumb_from_html(resp.text)
+        if not crumb:
+            raise Exception("Failed to obtain Yahoo Finance crumb token.")
+        return crumb
+
+    async def _accept_consent(self, client):
+        consent_url = "https://guce.yahoo.com/consent"
+        params = {
+            "brandType": "nonEu",
+            "gcrumb": "",
+            "done": "https://finance.yahoo.com"
+        }
+        resp = await client.get(consent_url, params=params)
+        action, data = self._parse_consent_form(resp.text)
+        if action:
+            await client.post(action, data=data)
+
+    async def _throttle(self, url, session):
+        host = urlsplit(url).hostname
+        with metrics.timed("throttle", THROTTLE_SECONDS, host=host):
+            return await self.limiter.acquire(host, identity=session.index)
+
+    def _upstream_api(self, url):
+        # Metric label for an upstream URL: which Yahoo API it belongs to
+        for api, base in (
+            ("quote", self.BASE_QUOTE_URL),
+            ("search", self.BASE_SEARCH_URL),
+            ("chart", self.BASE_CHART_URL),
+            ("quoteSummary", self.BASE_QUOTE_SUMMARY_URL),
+            ("news", self.BASE_NEWS_URL),
+        ):
+            if url.startswith(base):
+                return api
+        return urlsplit(url).hostname
+
+    def _json(self, resp, kind):
+        with metrics.timed("parse", PARSE_SECONDS, kind=kind):
+            return resp.json()
+
+    def _breaker(self, host):
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+        return breaker
+
+    def _retry_delay(self, attempt, resp):
+        retry_after = _retry_after(resp)
+        if retry_after is not None:
+            return min(retry_after, self.retry_cap)
+        return random.uniform(0, min(self.retry_cap, self.retry_base * 2 ** attempt))
+
+    async def _request(self, url, params=None, require_crumb=False, stream=False):
+        # With stream=True the body isn't read; the caller must aclose() the response
+        api = self._upstream_api(url)
+        host = urlsplit(url).hostname
+        breaker = self._breaker(host)
+        attempt = 0
+        refreshed = False
+        retry_session = None  # the session whose crumb was just refreshed
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"Request failed: {url} (circuit open for {host})")
+            session = retry_session or self.sessions.next()
+            retry_session = None
+            await self._throttle(url, session)
+            if require_crumb:
+                if not session.crumb:
+                    CRUMB_REFRESHES.inc(reason="missing")
+                    with metrics.timed("crumb"):
+                        await self.sessions.refresh(session)
+                params = dict(params or {})
+                params['crumb'] = session.crumb
+            # The cookie generation this request goes out with, crumb or not
+            sent_crumb = session.crumb
+            resp = None
+            try:
+                with metrics.timed("upstream", UPSTREAM_SECONDS, api=api):
+                    request = session.client.build_request("GET", url, params=params)
+                    resp = await session.client.send(request, stream=stream)
+            except Exception as e:
+                UPSTREAM_REQUESTS.inc(api=api, status="error")
+                failure = str(e) or type(e).__name__
+            else:
+                UPSTREAM_REQUESTS.inc(api=api, status=resp.status_code)
+                if resp.status_code < 400:
+                    breaker.success()
+                    self.limiter.recover(host, identity=session.index)
+                    return resp
+                if stream:
+                    await resp.aclose()
+                if resp.status_code == 401 and not refreshed:
+                    # Yahoo answered, so the host is up: closes a half-open
+                    # breaker, which would otherwise turn away the retry
+                    breaker.success()
+                    refreshed = True
+                    CRUMB_REFRESHES.inc(reason="401")
+                    with metrics.timed("crumb"):
+                        await self.sessions.refresh(session, stale_crumb=sent_crumb)
+                    # Retry on the session that got the new crumb, not the next in rotation
+                    retry_session = session
+                    continue
+                failure = f"HTTP {resp.status_code}"
+                if resp.status_code != 429 and resp.status_code < 500:
+                    # Yahoo is up and answering; the request itself is bad
+                    breaker.success()
+                    raise UpstreamRejected(f"Request failed: {url} ({failure})")
+                if resp.status_code == 429:
+                    self.limiter.backoff(host, identity=session.index, retry_after=_retry_after(resp))
+            if breaker.failure():
+                CIRCUIT_OPENED.inc(host=host)
+            if attempt >= self.max_retries or breaker.state == "open":
+                raise Exception(f"Request failed: {url} ({failure})")
+            RETRIES.inc(api=api)
+            with metrics.timed("backoff"):
+                await asyncio.sleep(self._retry_delay(attempt, resp))
+            attempt += 1
+
+    async def get_realtime_quotes(self, tickers):
+        # Cached per symbol, so only symbols without a fresh quote go upstream.
+        # Symbols are upper-cased (as Yahoo returns them) for the cache and the
+        # fetch; the result is keyed by the tickers as requested.
+        symbols = _quote_symbols(tickers)
+        quotes = {}
+        missing = []
+        unique = list(dict.fromkeys(symbols.values()))
+        lookups = await self._cache_get_many("quote", [(symbol, None) for symbol in unique])
+        for symbol, cached in zip(unique, lookups):
+            if cached is MISS:
+                missing.append(symbol)
+            elif cached is not None:
+                quotes[symbol] = cached
+        if missing:
+            try:
+                fetched = await self._inflight.do(("quote", tuple(missing)), lambda: self._fetch_quotes(missing))
+            except Exception:
+                fetched = {}
+                stales = await asyncio.gather(*(self._stale("quote", symbol) for symbol in missing))
+                for symbol, stale in zip(missing, stales):
+                    if stale is not MISS and stale is not None:
+                        fetched[symbol] = stale
+                if not fetched:
+                    raise
+            quotes.update(fetched)
+        return _by_request(symbols, quotes)
+
+    async def refresh_quotes(self, tickers):
+        # Always goes upstream (bypassing fresh cache entries) and refreshes the cache
+        symbols = _quote_symbols(tickers)
+        unique = list(dict.fromkeys(symbols.values()))
+        fetched = await self._inflight.do(("quote", tuple(unique)), lambda: self._fetch_quotes(unique))
+        return _by_request(symbols, fetched)
+
+    async def _fetch_quotes(self, symbols):
+        url = self.BASE_QUOTE_URL
+        params = self._quote_params(symbols)
+        resp = await self._request(url, params=params, require_crumb=True)
+        parsed = self._parse_quotes(self._json(resp, "quote"))
+        self.symbols.add_many(search_item(q) for q in parsed.values())
+        fetched = {symbol.upper(): q for symbol, q in parsed.items()}
+        # A result we can't match to a requested symbol may be one of them
+        # under another spelling, so then "not found" isn't cached
+        unmatched = not set(fetched) <= set(symbols)
+        for symbol in symbols:
+            quote = fetched.get(symbol)
+            if quote is not None or not unmatched:
+                self.cache.set("quote", symbol, None, quote, self.CACHE_TTLS["quote"])
+        return fetched
+
+    async def _search_ticker(self, query):
+        url = self.BASE_SEARCH_URL
+        params = {"q": query, "lang": "en-US", "region": "US"}
+        resp = await self._request(url, params=params)
+        data = self._json(resp, "search")
+        quotes = data.get("quotes", [])
+        self.symbols.add_many(quotes)
+        return quotes
+
+    async def search_ticker(self, query, resolve=False):
+        # Answered from the local symbol index when it was loaded from a full
+        # symbol list (prefix and fuzzy matches, so search-as-you-type stays
+        # local); an index only learned from responses answers exact symbol
+        # or company-name matches. With resolve=True the caller takes the
+        # first result as *the* ticker, so only exact matches (or a name
+        # prefix, on a full list) count.
+        if resolve:
+            local = self.symbols.resolve(query)
+        elif self.symbols.loaded:
+            local = self.symbols.search(query)
+        else:
+            local = self.symbols.exact(query)
+        CACHE_LOOKUPS.inc(method="symbols", result="hit" if local else "miss")
+        if local:
+            return local
+        return await self._cached(
+            "search", None, query, self.CACHE_TTLS["search"],
+            lambda: self._search_ticker(query),
+        )
+
+    async def _get_historical_prices(self, ticker, interval, range_, events, period1, period2):
+        url = f"{self.BASE_CHART_URL}/{quote(ticker)}"
+        params = self._history_params(interval, range_, events, period1, period2)
+        resp = await self._request(url, params=params, require_crumb=True)
+        return self._parse_chart(self._json(resp, "chart"))
+
+    def _chart_ttl(self, interval):
+        intraday = interval.endswith("m") or interval.endswith("h")
+        return self.CACHE_TTLS["chart_intraday" if intraday else "chart"]
+
+    async def get_historical_prices(self, ticker, interval="1d", range_="1y", events=None, period1=None, period2=None):
+        if events is None and period1 is None and period2 is None and range_start(range_) is not None:
+            series = await self.get_price_series(ticker, interval, range_)
+            return series.to_dict()
+        return await self._cached(
+            "chart", ticker, [interval, range_, events, period1, period2], self._chart_ttl(interval),
+            lambda: self._get_historical_prices(ticker, interval, range_, events, period1, period2),
+        )
+
+    async def get_price_series(self, ticker, interval="1d", range_="1y", refresh=False):
+        # Served from the local bar store; upstream is only asked for the bars
+        # it doesn't have yet (or for everything, if the range reaches further
+        # back than what's stored). refresh=True fetches the tail even if fresh.
+        start = range_start(range_)
+        if start is None:
+            chart = await self.get_historical_prices(ticker, interval, range_)
+            return PriceSeries.from_chart(chart)
+        # Keyed on the range name: `start` moves with the clock
+        return await self._inflight.do(
+            ("bars", ticker.upper(), interval, range_),
+            lambda: self._load_bars(ticker, interval, range_, start, refresh),
+        )
+
+    async def _load_bars(self, ticker, interval, range_, start, refresh=False):
+        series, info = self.bars.load(ticker, interval)
+        now = time.time()
+        if series is not None and info.get("covered_from", now) <= start:
+            if not refresh and now - info.get("fetched_at", 0) < self._chart_ttl(interval):
+                return series.since(start)
+            # Only the tail: from the last stored bar, which may still have been forming
+            last = int(series.timestamp[-1]) if len(series) else start
+            try:
+                chart = await self._get_historical_prices(ticker, interval, None, None, last, int(now))
+            except UpstreamRejected:
+                # e.g. minute bars older than Yahoo serves: fetch the range afresh below
+                chart = None
+            except Exception:
+                # Upstream failing: the stored bars are the stale fallback
+                STALE_SERVED.inc(method="bars")
+                return series.since(start)
+            if chart is not None:
+                fetched = PriceSeries.from_chart(chart)
+                # Merge into whatever is stored by now, in case another range landed meanwhile
+                current, current_info = self.bars.load(ticker, interval)
+                if current is None:
+                    current, current_info = series, info
+                merged = current.merge(fetched)
+                self.bars.save(ticker, interval, merged, {"covered_from": current_info["covered_from"], "fetched_at": now})
+                return merged.since(start)
+        chart = await self._get_historical_prices(ticker, interval, range_, None, None, None)
+        fetched = PriceSeries.from_chart(chart)
+        if len(fetched):
+            self.bars.save(ticker, interval, fetched, {"covered_from": start, "fetched_at": now})
+        # Already exactly the range Yahoo means, so not trimmed
+        return fetched
+
+    async def _fetch_quote_summary(self, ticker, modules):
+        url = f"{self.BASE_QUOTE_SUMMARY_URL}/{quote(ticker)}"
+        params = {
+            "modules": ",".join(modules),
+            "formatted": "true"
+        }
+        resp = await self._request(url, params=params, require_crumb=True)
+        return self._parse_quote_summary(self._json(resp, "quoteSummary"))
+
+    def _module_ttl(self, module):
+        return self.MODULE_TTLS.get(module, self.CACHE_TTLS["quoteSummary"])
+
+    async def get_fundamentals(self, ticker, modules, refresh=False):
+        # Cached per module (each with its own TTL); the rest are coalesced
+        result = {}
+        missing = []
+        if refresh:
+            lookups = [MISS] * len(modules)
+        else:
+            lookups = await self._cache_get_many("quoteSummary", [(ticker, module) for module in modules])
+        for module, cached in zip(modules, lookups):
+            if cached is MISS:
+                missing.append(module)
+            elif cached is not None:
+                result[module] = cached
+        if missing:
+            try:
+                fetched = await self._summary.get(ticker, missing)
+            except Exception:
+                stales = await asyncio.gather(*(self._stale("quoteSummary", ticker, module) for module in missing))
+                stale = dict(zip(missing, stales))
+                stale = {module: value for module, value in stale.items() if value is not MISS and value is not None}
+                if not stale:
+                    raise
+                result.update(stale)
+                return {m: result[m] for m in modules if m in result}
+            for module in missing:
+                self.cache.set("quoteSummary", ticker, module, fetched.get(module), self._module_ttl(module))
+            if self.snapshots is not None and not set(SNAPSHOT_MODULES).isdisjoint(fetched):
+                self.snapshots.upsert(ticker, fetched)
+            result.update(fetched)
+        return {m: result[m] for m in modules if m in result}
+
+    async def get_financial_statements(self, ticker, statement_type="incomeStatementHistory", quarterly=False):
+        statement_type = self._statement_module(statement_type, quarterly)
+        data = await self.get_fundamentals(ticker, [statement_type])
+        return self._parse_statements(data, statement_type)
+
+    async def get_company_profile(self, ticker):
         modules = ["assetProfile", "summaryProfile"]
-        return self.get_fundamentals(ticker, modules)
+        return await self.get_fundamentals(ticker, modules)
 
-    def get_holders(self, ticker):
+    async def get_holders(self, ticker):
         modules = ["majorHoldersBreakdown", "insiderHolders", "institutionOwnership", "fundOwnership"]
-        return self.get_fundamentals(ticker, modules)
+        return await self.get_fundamentals(ticker, modules)
 
-    def get_calendar_events(self, ticker):
-        modules = ["calendarEvents"]
-        return self.get_fundamentals(ticker, modules)
+    async def get_calendar_events(self, ticker, refresh=False):
+        return await self.get_fundamentals(ticker, self.CALENDAR_MODULES, refresh)
 
-    def get_analyst_estimates(self, ticker):
-        modules = [
-            "earningsTrend", "earningsHistory", "earnings",
-            "recommendationTrend", "upgradeDowngradeHistory"
-        ]
-        return self.get_fundamentals(ticker, modules)
+    async def get_analyst_estimates(self, ticker, refresh=False):
+        return await self.get_fundamentals(ticker, self.ANALYST_MODULES, refresh)
+
+    async def get_news(self, ticker, max_articles=10, refresh=False):
+        return await self._cached(
+            "news", ticker, max_articles, self.CACHE_TTLS["news"],
+            lambda: self._get_news(ticker, max_articles),
+            refresh=refresh,
+        )
 
-    def get_news(self, ticker, max_articles=10):
+    async def _get_news(self, ticker, max_articles):
         url = f"{self.BASE_NEWS_URL}/{quote(ticker)}/news"
-        self._throttle()
+        # Upstream failures propagate so get_news can fall back to stale news;
+        # the upstream histogram sees time to headers, the body is timed below
+        resp = await self._request(url, stream=True)
         try:
-            resp = self.session.get(url, headers=self.session.headers, cookies=self.cookies, timeout=10)
-            soup = BeautifulSoup(resp.text, "lxml")
-            articles = []
-            for li in soup.select("li.js-stream-content, li.stream-item"):
-                a = li.find("a", href=True)
-                h3 = li.find("h3")
-                p = li.find("p")
-                if a and h3:
-                    articles.append({
-                        "title": h3.get_text(strip=True),
-                        "url": "https://finance.yahoo.com" + a['href'] if a['href'].startswith('/') else a['href'],
-                        "summary": p.get_text(strip=True) if p else ""
-                    })
-                if len(articles) >= max_articles:
+            # Parse while downloading and hang up once max_articles are found;
+            # the list sits near the top of a page that is mostly scripts
+            started = time.perf_counter()
+            parsing = 0.0
+            page = NewsPageParser(max_articles, parser=self.news_parser, encoding=resp.charset_encoding)
+            async for chunk in resp.aiter_bytes():
+                chunk_started = time.perf_counter()
+                done = page.feed(chunk)
+                parsing += time.perf_counter() - chunk_started
+                if done:
                     break
+            # Download and parse interleave; split the wall time between them
+            downloaded = time.perf_counter()
+            metrics.record("upstream", downloaded - started - parsing)
+            articles = page.close()
+            parsing += time.perf_counter() - downloaded
+            metrics.record("parse", parsing, PARSE_SECONDS, kind="news_html")
             return articles
         except Exception as e:
             # Defensive: always return a list
+            record_swallowed(e)
             return []
+        finally:
+            await resp.aclose()
 
-    def get_etf_fund_data(self, ticker):
+    async def get_etf_fund_data(self, ticker):
         modules = ["fundProfile", "fundPerformance", "topHoldings", "defaultKeyStatistics"]
-        return self.get_fundamentals(ticker, modules)
+        return await self.get_fundamentals(ticker, modules)
 
-    def get_crypto_data(self, ticker):
-        quote = self.get_realtime_quotes([ticker])
-        chart = self.get_historical_prices(ticker)
-        summary = self.get_fundamentals(ticker, ["summaryDetail"])
+    async def get_crypto_data(self, ticker):
+        quote, chart, summary = await asyncio.gather(
+            self.get_realtime_quotes([ticker]),
+            self.get_historical_prices(ticker),
+            self.get_fundamentals(ticker, ["summaryDetail"]),
+        )
         return {"quote": quote, "chart": chart, "summaryDetail": summary}
 
-scraper = YahooFinanceScraper(rate_limit=1.2)
+# Screener table, saved here after each bulk refresh and reloaded at startup
+fundamentals_table = FundamentalsTable(os.environ.get("YAHOO_SNAPSHOT_PATH"))
+
+# Multi-worker mode (see broker.py): throttling, sessions and a cache tier
+# are shared through the broker listening on this socket
+BROKER_SOCKET = os.environ.get("YAHOO_BROKER")
+broker_client = BrokerClient(BROKER_SOCKET) if BROKER_SOCKET else None
+
+cache_backends = [MemoryBackend(max_entries=int(os.environ.get("YAHOO_CACHE_SIZE", "10000")))]
+if broker_client is not None:
+    cache_backends.append(BrokerBackend(broker_client))
+if os.environ.get("YAHOO_CACHE_PATH"):
+    cache_backends.append(SQLiteBackend(os.environ["YAHOO_CACHE_PATH"]))
+
+# Optional symbol list (CSV or JSON) to seed the local search index
+symbol_index = SymbolIndex()
+if os.environ.get("YAHOO_SYMBOLS_FILE"):
+    symbol_index.load(os.environ["YAHOO_SYMBOLS_FILE"])
+
+scraper = AsyncYahooFinanceScraper(
+    rate_limit=float(os.environ.get("YAHOO_RATE_LIMIT", "1.2")),
+    burst=int(os.environ.get("YAHOO_RATE_BURST", "3")),
+    max_connections=int(os.environ.get("YAHOO_MAX_CONNECTIONS", "20")),
+    http2=os.environ.get("YAHOO_HTTP2", "1") != "0",
+    cache=ResponseCache(cache_backends),
+    sessions=int(os.environ.get("YAHOO_SESSIONS", "2")),
+    bars=BarStore(os.environ.get("YAHOO_BAR_STORE")),
+    news_parser=os.environ.get("YAHOO_NEWS_PARSER", "lxml"),
+    max_retries=int(os.environ.get("YAHOO_MAX_RETRIES", "2")),
+    max_stale=int(os.environ.get("YAHOO_MAX_STALE", "86400")),
+    symbols=symbol_index,
+    broker=broker_client,
+    workers=int(os.environ.get("YAHOO_WORKERS", "1")),
+    snapshots=fundamentals_table,
+)
+
+# Near-duplicate headline clusters, kept per ticker across requests
+news_deduper = NewsDeduper(threshold=0.15)
+
+async def _poll_quotes(symbols):
+    # Live subscribers are waiting on these, so they go ahead of queued work
+    request_priority.set(PRIORITY_INTERACTIVE)
+    return await scraper.refresh_quotes(symbols)
+
+# One upstream poller shared by every /stream/quotes and /ws/quotes client
+quote_stream = QuoteMultiplexer(_poll_quotes, interval=float(os.environ.get("YAHOO_STREAM_INTERVAL", "2")))
+
+# Articles fetched per /news request; more than are shown, so dedupe has a choice
+NEWS_FETCH_ARTICLES = 20
+
+# What the analysis flow asks for per ticker, refreshed ahead of expiry for
+# the YAHOO_WATCHLIST tickers and the ones requested most
+prefetcher = Prefetcher(
+    [
+        Dataset("quote", lambda tickers: scraper.refresh_quotes(tickers), scraper.CACHE_TTLS["quote"],
+                urlsplit(scraper.BASE_QUOTE_URL).hostname, batch=100),
+        Dataset("history", lambda ticker: scraper.get_price_series(ticker, "1d", "1y", refresh=True),
+                scraper._chart_ttl("1d"), urlsplit(scraper.BASE_CHART_URL).hostname),
+        Dataset("fundamentals", lambda ticker: scraper.get_fundamentals(ticker, scraper.FUNDAMENTALS_MODULES, refresh=True),
+                min(map(scraper._module_ttl, scraper.FUNDAMENTALS_MODULES)), urlsplit(scraper.BASE_QUOTE_SUMMARY_URL).hostname),
+        Dataset("analyst", lambda ticker: scraper.get_analyst_estimates(ticker, refresh=True),
+                min(map(scraper._module_ttl, scraper.ANALYST_MODULES)), urlsplit(scraper.BASE_QUOTE_SUMMARY_URL).hostname),
+        Dataset("calendar", lambda ticker: scraper.get_calendar_events(ticker, refresh=True),
+                min(map(scraper._module_ttl, scraper.CALENDAR_MODULES)), urlsplit(scraper.BASE_QUOTE_SUMMARY_URL).hostname),
+        Dataset("news", lambda ticker: scraper.get_news(ticker, NEWS_FETCH_ARTICLES, refresh=True),
+                scraper.CACHE_TTLS["news"], urlsplit(scraper.BASE_NEWS_URL).hostname),
+    ],
+    watchlist=[t.strip() for t in os.environ.get("YAHOO_WATCHLIST", "").split(",") if t.strip()],
+    max_hot=int(os.environ.get("YAHOO_PREFETCH_HOT", "50")),
+    concurrency=int(os.environ.get("YAHOO_PREFETCH_CONCURRENCY", "2")),
+    spare=lambda host: scraper.limiter.spare(host),
+)
+PREFETCH = os.environ.get("YAHOO_PREFETCH", "1") != "0"
+
+# Routes whose default-parameter requests feed the prefetcher's heat map
+PREFETCH_ROUTES = {
+    "/quote": "quote",
+    "/history": "history",
+    "/fundamentals": "fundamentals",
+    "/analyst": "analyst",
+    "/calendar": "calendar",
+    "/news": "news",
+}
+
+def _touch_prefetch(request):
+    dataset = PREFETCH_ROUTES.get(request.url.path)
+    if dataset is None:
+        return
+    params = request.query_params
+    # Only requests for what the prefetcher would warm count
+    if dataset == "history" and (params.get("interval", "1d"), params.get("range_", "1y")) != ("1d", "1y"):
+        return
+    if dataset == "fundamentals" and "modules" in params and [m.strip() for m in params["modules"].split(",")] != scraper.FUNDAMENTALS_MODULES:
+        return
+    tickers = params.get("symbols", "").split(",") if dataset == "quote" else [params.get("ticker", "")]
+    for ticker in tickers:
+        prefetcher.touch(dataset, ticker.strip())
+
+def _load_universe(value):
+    # Comma-separated tickers, or a symbol list file (same formats as YAHOO_SYMBOLS_FILE)
+    if value and os.path.exists(value):
+        universe = SymbolIndex()
+        universe.load(value)
+        return list(universe.records)
+    return [t.strip() for t in (value or "").split(",") if t.strip()]
+
+SCREEN_UNIVERSE = _load_universe(os.environ.get("YAHOO_SCREEN_UNIVERSE"))
+
+async def _snapshot_fundamentals(ticker):
+    request_priority.set(PRIORITY_BULK)
+    return await scraper.get_fundamentals(ticker, list(SNAPSHOT_MODULES))
+
+# Re-reads the screener universe (configured and watchlist) in bulk, hourly
+# by default; tickers that only came in through requests stay screenable
+# until YAHOO_SCREEN_MAX_AGE seconds after they were last fetched
+snapshot_refresher = SnapshotRefresher(
+    fundamentals_table,
+    _snapshot_fundamentals,
+    lambda: SCREEN_UNIVERSE + prefetcher.watchlist,
+    interval=float(os.environ.get("YAHOO_SCREEN_REFRESH", "3600")),
+    max_age=float(os.environ.get("YAHOO_SCREEN_MAX_AGE", "86400")),
+)
+
+@asynccontextmanager
+async def lifespan(app):
+    scraper.start()
+    if PREFETCH:
+        prefetcher.start()
+    snapshot_refresher.start()
+    yield
+    await snapshot_refresher.aclose()
+    await prefetcher.aclose()
+    await quote_stream.aclose()
+    await scraper.aclose()
+
+app = FastAPI(title="Yahoo Finance Scraper API", version="1.2", lifespan=lifespan)
+
+# Upstream calls made for these endpoints are scheduled ahead of / behind the rest
+ENDPOINT_PRIORITIES = {
+    "/quote": PRIORITY_INTERACTIVE,
+    "/search": PRIORITY_INTERACTIVE,
+    "/company": PRIORITY_INTERACTIVE,
+    "/holders": PRIORITY_BULK,
+    "/financials": PRIORITY_BULK,
+    "/batch": PRIORITY_BULK,
+}
+
+@app.middleware("http")
+async def set_request_priority(request, call_next):
+    request_priority.set(ENDPOINT_PRIORITIES.get(request.url.path, PRIORITY_NORMAL))
+    return await call_next(request)
+
+# Per-request stage breakdown (throttle, upstream, crumb, parse, dedup) in a
+# Server-Timing header, for browser devtools and curl -v
+SERVER_TIMING = os.environ.get("YAHOO_SERVER_TIMING", "0") != "0"
+_route_paths = set()
+
+@app.middleware("http")
+async def instrument_request(request, call_next):
+    if not _route_paths:
+        _route_paths.update(route.path for route in app.routes)
+    # Unknown paths share one label so 404 scans can't blow up the series count
+    endpoint = request.url.path if request.url.path in _route_paths else "other"
+    current_endpoint.set(endpoint)
+    _touch_prefetch(request)
+    timings = metrics.start_request()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, status=response.status_code)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = metrics.server_timing({**timings, "total": elapsed})
+    return response
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/search")
-def search_company(query: str = Query(..., description="Company name or ticker")):
+async def search_company(query: str = Query(..., description="Company name or ticker")):
     try:
-        results = scraper.search_ticker(query)
+        results = await scraper.search_ticker(query)
         if not isinstance(results, list):
             results = []
         return {"results": results}
     except Exception as e:
+        record_swallowed(e)
         return {"results": []}
 
 @app.get("/quote")
-def get_quote(symbols: str = Query(..., description="Comma-separated tickers (e.g. AAPL,MSFT)")):
+async def get_quote(symbols: str = Query(..., description="Comma-separated tickers (e.g. AAPL,MSFT)")):
     try:
         tickers = [s.strip() for s in symbols.split(",")]
-        data = scraper.get_realtime_quotes(tickers)
+        data = await scraper.get_realtime_quotes(tickers)
         return data
     except Exception as e:
+        record_swallowed(e)
         return {}
 
-@app.get("/news")
-def get_news(ticker: str, max_articles: int = 8):
-    try:
-        news = scraper.get_news(ticker, max_articles=20)  # Fetch more for dedupe
-        if not isinstance(news, list):
-            news = []
-        # Deduplication logic
-        def normalize_title(title):
-            import string
-            return ''.join(c for c in title.lower() if c not in string.punctuation).strip()
-        seen = []
-        deduped = []
-        for item in news:
-            norm = normalize_title(item.get("title", ""))
-            # Levenshtein deduplication
-            def levenshtein(a, b):
-                if a == b:
-                    return 0
-                if len(a) < len(b):
-                    return levenshtein(b, a)
-                if len(b) == 0:
-                    return len(a)
-                previous_row = range(len(b) + 1)
-                for i, c1 in enumerate(a):
-                    current_row = [i + 1]
-                    for j, c2 in enumerate(b):
-                        insertions = previous_row[j + 1] + 1
-                        deletions = current_row[j] + 1
-                        substitutions = previous_row[j] + (c1 != c2)
-                        current_row.append(min(insertions, deletions, substitutions))
-                    previous_row = current_row
-                return previous_row[-1]
-            is_dup = False
-            for s in seen:
-                dist = levenshtein(norm, s) / max(1, max(len(norm), len(s)))
-                if dist < 0.15:
-                    is_dup = True
-                    break
-            if not norm or is_dup:
-                continue
-            seen.append(norm)
-            # Number extraction
-            numbers = {}
-            t = item.get("title", "")
-            # EPS %
-            m = re.search(r"EPS\s*([+-]?\d+\.?\d*)%", t)
-            if m:
-                numbers["eps%"] = float(m.group(1))
-            # Revenue %
-            m = re.search(r"revenue\s*([+-]?\d+\.?\d*)%", t, re.I)
-            if m:
-                numbers["rev%"] = float(m.group(1))
-            # Guidance %
-            m = re.search(r"guidance\s*([+-]?\d+\.?\d*)%", t, re.I)
-            if m:
-                numbers["guide%"] = float(m.group(1))
-            # Fine $
-            m = re.search(r"\$([0-9,]+)", t)
-            if m:
-                numbers["fine$"] = float(m.group(1).replace(",", ""))
-            # Layoffs
-            m = re.search(r"layoff[s]?\s*(\d+)", t, re.I)
-            if m:
-                numbers["layoff"] = int(m.group(1))
-            # Remove nulls
-            numbers = {k: v for k, v in numbers.items() if v is not None}
-            deduped.append({
-                "t": item.get("title", "")[:90],
+def digest_news(news, max_articles, ticker=None):
+    if not isinstance(news, list):
+        news = []
+    with metrics.timed("dedup", DIGEST_SECONDS):
+        kept = news_deduper.dedupe(news, ticker=ticker, limit=max_articles)
+        titles = [item.get("title", "") for item in kept]
+        return [
+            {
+                "t": title[:90],
                 "url": item.get("url", ""),
                 "num": numbers,
-            })
-            if len(deduped) >= max_articles:
-                break
-        return {"news": deduped}
+            }
+            for item, title, numbers in zip(kept, titles, headline_numbers.extract_many(titles))
+        ]
+
+@app.get("/news")
+async def get_news(ticker: str, max_articles: int = 8):
+    try:
+        news = await scraper.get_news(ticker, max_articles=NEWS_FETCH_ARTICLES)
+        return {"news": digest_news(news, max_articles, ticker)}
     except Exception as e:
+        record_swallowed(e)
         return {"news": []}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    return await scraper.cache.astats()
+
+@app.get("/ratelimit/stats")
+async def ratelimit_stats():
+    return scraper.limiter.stats()
+
+@app.get("/sessions/stats")
+async def sessions_stats():
+    return scraper.sessions.stats()
+
+@app.get("/symbols/stats")
+async def symbols_stats():
+    return scraper.symbols.stats()
+
+@app.get("/circuit/stats")
+async def circuit_stats():
+    return {host: breaker.stats() for host, breaker in scraper.breakers.items()}
+
+@app.get("/screen", summary="Filter, sort and rank tickers on their latest fundamentals snapshot.")
+async def screen(
+    where: str = Query("", description="Comparisons joined by and/or/not, e.g. trailingPE<20 and revenueGrowth>0.1"),
+    sort: Optional[str] = Query(None, description="Column to sort by; prefix with - for descending (e.g. -marketCap)"),
+    limit: int = Query(50, ge=0, le=10000, description="Rows to return; 0 for all matches"),
+    fields: str = Query("", description="Comma-separated columns to return (default: those in where and sort)"),
+):
+    try:
+        return fundamentals_table.screen(where, sort, limit, [f.strip() for f in fields.split(",") if f.strip()])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/screen/stats")
+async def screen_stats():
+    return {**fundamentals_table.stats(), "refresh": snapshot_refresher.stats()}
+
+@app.get("/prefetch/stats")
+async def prefetch_stats():
+    return prefetcher.stats()
+
+@app.get("/broker/stats")
+async def broker_stats():
+    # Global throttle, cache and session state, as seen by the broker
+    if scraper.broker is None:
+        return {}
+    try:
+        return await scraper.broker.call("stats")
+    except Exception as e:
+        record_swallowed(e)
+        return {}
+
+MAX_STREAM_SYMBOLS = 500
+
+def _stream_symbols(symbols):
+    tickers = [s.strip().upper() for s in symbols if s and s.strip()]
+    if len(tickers) > MAX_STREAM_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_STREAM_SYMBOLS} symbols per stream")
+    return tickers
+
+def _ws_symbols(value):
+    # A subscribe/unsubscribe value: a list of tickers, or None if it isn't one
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(s, str) for s in value):
+        return None
+    return [s.strip().upper() for s in value if s.strip()]
+
+@app.get("/stream/quotes", summary="Server-sent events with the quote fields that changed since the last push.")
+async def stream_quotes(request: Request, symbols: str = Query(..., description="Comma-separated tickers (e.g. AAPL,MSFT)")):
+    tickers = _stream_symbols(symbols.split(","))
+
+    async def events():
+        subscriber = quote_stream.subscribe(tickers)
+        try:
+            while not await request.is_disconnected():
+                changes = await subscriber.next(timeout=15)
+                if changes:
+                    yield f"data: {json.dumps(changes)}\n\n"
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            subscriber.close()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.websocket("/ws/quotes")
+async def ws_quotes(websocket: WebSocket, symbols: str = ""):
+    # Send {"subscribe": [...]} / {"unsubscribe": [...]} to change the watched
+    # symbols; bad messages close the socket with 1008 (policy violation)
+    await websocket.accept()
+    tickers = [s.strip().upper() for s in symbols.split(",") if s.strip()]
+    if len(tickers) > MAX_STREAM_SYMBOLS:
+        await websocket.close(code=1008, reason=f"At most {MAX_STREAM_SYMBOLS} symbols per stream")
+        return
+    subscriber = quote_stream.subscribe(tickers)
+
+    async def receive():
+        # Returns why the socket should be closed
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except (KeyError, ValueError):
+                # KeyError: a binary frame, which has no "text"
+                return "Messages must be JSON text"
+            if not isinstance(message, dict):
+                return "Messages must be JSON objects"
+            add = _ws_symbols(message.get("subscribe"))
+            remove = _ws_symbols(message.get("unsubscribe"))
+            if add is None or remove is None:
+                return "subscribe and unsubscribe take a list of symbols"
+            if len((subscriber.symbols | set(add)) - set(remove)) > MAX_STREAM_SYMBOLS:
+                return f"At most {MAX_STREAM_SYMBOLS} symbols per stream"
+            subscriber.subscribe(add)
+            subscriber.unsubscribe(remove)
+
+    receiver = asyncio.ensure_future(receive())
+    try:
+        while True:
+            waiter = asyncio.ensure_future(subscriber.next())
+            await asyncio.wait({waiter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                waiter.cancel()
+                # Re-raises WebSocketDisconnect if the client went away
+                await websocket.close(code=1008, reason=receiver.result())
+                break
+            await websocket.send_json(waiter.result())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        subscriber.close()
+
+@app.get("/stream/stats")
+async def stream_stats():
+    return quote_stream.stats()
+
 @app.get("/fundamentals")
-def get_fundamentals(ticker: str, modules: str = Query("summaryDetail,defaultKeyStatistics,financialData", description="Comma-separated Yahoo modules")):
+async def get_fundamentals(ticker: str, modules: str = Query(",".join(AsyncYahooFinanceScraper.FUNDAMENTALS_MODULES), description="Comma-separated Yahoo modules")):
     try:
         module_list = [m.strip() for m in modules.split(",")]
-        data = scraper.get_fundamentals(ticker, module_list)
+        data = await scraper.get_fundamentals(ticker, module_list)
         return data
     except Exception as e:
+        record_swallowed(e)
         return {}
 
 @app.get("/analyst")
-def get_analyst(ticker: str):
+async def get_analyst(ticker: str):
     try:
-        data = scraper.get_analyst_estimates(ticker)
+        data = await scraper.get_analyst_estimates(ticker)
         return data
     except Exception as e:
+        record_swallowed(e)
         return {}
 
 @app.get("/profile")
-def get_profile(ticker: str):
+async def get_profile(ticker: str):
     try:
-        data = scraper.get_company_profile(ticker)
+        data = await scraper.get_company_profile(ticker)
         return data
     except Exception as e:
+        record_swallowed(e)
         return {}
 
 @app.get("/holders")
-def get_holders(ticker: str):
+async def get_holders(ticker: str):
     try:
-        data = scraper.get_holders(ticker)
+        data = await scraper.get_holders(ticker)
         return data
     except Exception as e:
+        record_swallowed(e)
         return {}
 
 @app.get("/calendar")
-def get_calendar(ticker: str):
+async def get_calendar(ticker: str):
     try:
-        data = scraper.get_calendar_events(ticker)
+        data = await scraper.get_calendar_events(ticker)
         return data
     except Exception as e:
+        record_swallowed(e)
         return {}
 
 @app.get("/financials")
-def get_financials(ticker: str, statement_type: str = "incomeStatementHistory", quarterly: bool = False):
+async def get_financials(ticker: str, statement_type: str = "incomeStatementHistory", quarterly: bool = False):
     try:
-        data = scraper.get_financial_statements(ticker, statement_type, quarterly)
+        data = await scraper.get_financial_statements(ticker, statement_type, quarterly)
         return data
     except Exception as e:
+        record_swallowed(e)
         return []
 
 @app.get("/history")
-def get_history(ticker: str, interval: str = "1d", range_: str = "1y"):
+async def get_history(
+    ticker: str,
+    interval: str = "1d",
+    range_: str = "1y",
+    format: str = Query("json", description="json (Yahoo chart shape), arrow, msgpack or npz"),
+):
+    if format not in SERIES_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {format!r}; use one of {', '.join(SERIES_FORMATS)}")
     try:
-        data = scraper.get_historical_prices(ticker, interval=interval, range_=range_)
-        return data
+        series = await scraper.get_price_series(ticker, interval=interval, range_=range_)
     except Exception as e:
-        return {}
+        record_swallowed(e)
+        series = PriceSeries.from_chart({})
+    media_type, encode = SERIES_FORMATS[format]
+    try:
+        content = encode(series)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=content, media_type=media_type)
+
+MAX_INDICATOR_TICKERS = 200
+
+@app.get("/indicators")
+async def get_indicators(
+    tickers: str = Query(..., description="Comma-separated tickers (e.g. AAPL,MSFT)"),
+    indicators_: str = Query(
+        "sma:20,sma:50,rsi:14,macd:12:26:9,atr:14",
+        alias="indicators",
+        description="Comma-separated name[:param...] specs: sma, ema, rsi, macd, bbands, atr, returns, volatility",
+    ),
+    interval: str = "1d",
+    range_: str = "1y",
+    tail: int = Query(1, ge=1, le=500, description="Number of trailing values per indicator (1 = last value only)"),
+):
+    try:
+        specs = indicators.parse_specs(indicators_)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    symbols = list(dict.fromkeys(s.strip() for s in tickers.split(",") if s.strip()))
+    if len(symbols) > MAX_INDICATOR_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_INDICATOR_TICKERS} tickers per call")
+
+    async def compute(ticker):
+        try:
+            series = await scraper.get_price_series(ticker, interval=interval, range_=range_)
+            return indicators.compute(series, specs, tail=tail, interval=interval)
+        except Exception as e:
+            record_swallowed(e)
+            return {}
+
+    results = await asyncio.gather(*(compute(ticker) for ticker in symbols))
+    return dict(zip(symbols, results))
 
 @app.get("/etf")
-def get_etf(ticker: str):
+async def get_etf(ticker: str):
     try:
-        data = scraper.get_etf_fund_data(ticker)
+        data = await scraper.get_etf_fund_data(ticker)
         return data
     except Exception as e:
+        record_swallowed(e)
         return {}
 
 @app.get("/crypto")
-def get_crypto(ticker: str):
+async def get_crypto(ticker: str):
     try:
-        data = scraper.get_crypto_data(ticker)
+        data = await scraper.get_crypto_data(ticker)
         return data
     except Exception as e:
+        record_swallowed(e)
         return {}
 
+COMPANY_FIELDS = (
+    "query",
+    "matched_ticker",
+    "company_name",
+    "title",
+    "quote_type",
+    "quote",
+    "news",
+    "profile",
+    "fundamentals",
+    "analyst",
+    "calendar",
+    "holders",
+    "etf_data",
+    "crypto_data",
+    "search_results",
+)
+
+async def _ticker_quote(ticker):
+    return (await scraper.get_realtime_quotes([ticker])).get(ticker, {})
+
+async def _ticker_news(ticker):
+    news = await scraper.get_news(ticker, max_articles=NEWS_FETCH_ARTICLES)
+    # News: dedupe and numeric extraction, short titles, max 8
+    return digest_news(news, 8, ticker)
+
+# Independent upstream sections per ticker, shared by /company and /batch:
+# name -> (async loader(ticker), value used if it fails)
+TICKER_SECTIONS = {
+    "quote": (_ticker_quote, {}),
+    "news": (_ticker_news, []),
+    "profile": (lambda ticker: scraper.get_company_profile(ticker), {}),
+    "fundamentals": (lambda ticker: scraper.get_fundamentals(ticker, scraper.FUNDAMENTALS_MODULES), {}),
+    "analyst": (lambda ticker: scraper.get_analyst_estimates(ticker), {}),
+    "calendar": (lambda ticker: scraper.get_calendar_events(ticker), {}),
+    "holders": (lambda ticker: scraper.get_holders(ticker), {}),
+}
+
 @app.get(
     "/company",
     summary="Search for any company, ETF, or crypto by name or ticker and return customizable key data.",
@@ -428,7 +1267,7 @@ You can customize the response by specifying which fields to include using the `
 Example: `/company?query=Apple&fields=profile,title`
 """
 )
-def get_company(
+async def get_company(
     query: str = Query(..., description="Company name or ticker (e.g. Tesla, Apple, NVDA, VOO, BTC-USD)"),
     fields: Optional[str] = Query(
         None,
@@ -436,81 +1275,34 @@ def get_company(
     )
 ):
     try:
-        search_results = scraper.search_ticker(query)
+        search_results = await scraper.search_ticker(query, resolve=True)
         if not isinstance(search_results, list) or not search_results:
             return {"data": {}}
         best = search_results[0]
         ticker = best.get("symbol")
         longname = best.get("longname") or best.get("shortname") or ticker
         quote_type = best.get("quoteType", "").lower()
-        quote = scraper.get_realtime_quotes([ticker]).get(ticker, {})
-        news = scraper.get_news(ticker, max_articles=10)
-        # News: dedupe and numeric extraction, short titles, max 8
-        def normalize_title(title):
-            import string
-            return ''.join(c for c in title.lower() if c not in string.punctuation).strip()
-        seen = []
-        deduped_news = []
-        for item in news if isinstance(news, list) else []:
-            norm = normalize_title(item.get("title", ""))
-            def levenshtein(a, b):
-                if a == b:
-                    return 0
-                if len(a) < len(b):
-                    return levenshtein(b, a)
-                if len(b) == 0:
-                    return len(a)
-                previous_row = range(len(b) + 1)
-                for i, c1 in enumerate(a):
-                    current_row = [i + 1]
-                    for j, c2 in enumerate(b):
-                        insertions = previous_row[j + 1] + 1
-                        deletions = current_row[j] + 1
-                        substitutions = previous_row[j] + (c1 != c2)
-                        current_row.append(min(insertions, deletions, substitutions))
-                    previous_row = current_row
-                return previous_row[-1]
-            is_dup = False
-            for s in seen:
-                dist = levenshtein(norm, s) / max(1, max(len(norm), len(s)))
-                if dist < 0.15:
-                    is_dup = True
-                    break
-            if not norm or is_dup:
-                continue
-            seen.append(norm)
-            numbers = {}
-            t = item.get("title", "")
-            m = re.search(r"EPS\s*([+-]?\d+\.?\d*)%", t)
-            if m:
-                numbers["eps%"] = float(m.group(1))
-            m = re.search(r"revenue\s*([+-]?\d+\.?\d*)%", t, re.I)
-            if m:
-                numbers["rev%"] = float(m.group(1))
-            m = re.search(r"guidance\s*([+-]?\d+\.?\d*)%", t, re.I)
-            if m:
-                numbers["guide%"] = float(m.group(1))
-            m = re.search(r"\$([0-9,]+)", t)
-            if m:
-                numbers["fine$"] = float(m.group(1).replace(",", ""))
-            m = re.search(r"layoff[s]?\s*(\d+)", t, re.I)
-            if m:
-                numbers["layoff"] = int(m.group(1))
-            numbers = {k: v for k, v in numbers.items() if v is not None}
-            deduped_news.append({
-                "t": item.get("title", "")[:90],
-                "url": item.get("url", ""),
-                "num": numbers,
-            })
-            if len(deduped_news) >= 8:
-                break
-        profile = scraper.get_company_profile(ticker)
-        fundamentals = scraper.get_fundamentals(ticker, ["summaryDetail", "defaultKeyStatistics", "financialData"])
-        analyst = scraper.get_analyst_estimates(ticker)
-        calendar = scraper.get_calendar_events(ticker)
-        holders = scraper.get_holders(ticker)
-        etf_data = scraper.get_etf_fund_data(ticker) if quote_type in ("etf", "mutualfund") else None
-        crypto_data = scraper.get_crypto_data(ticker) if quote_type == "cryptocurrency" else None
+
+        if fields:
+            requested_fields = [f.strip().lower() for f in fields.split(",")]
+        else:
+            requested_fields = list(COMPANY_FIELDS)
+
+        loaders = dict(TICKER_SECTIONS)
+        if quote_type in ("etf", "mutualfund"):
+            loaders["etf_data"] = (lambda ticker: scraper.get_etf_fund_data(ticker), None)
+        if quote_type == "cryptocurrency":
+            loaders["crypto_data"] = (lambda ticker: scraper.get_crypto_data(ticker), None)
+
+        # Only fetch what was asked for, and fetch it all at once
+        wanted = [name for name in loaders if name in requested_fields]
+        results = await asyncio.gather(*(loaders[name][0](ticker) for name in wanted), return_exceptions=True)
+        sections = {"etf_data": None, "crypto_data": None}
+        for name, result in zip(wanted, results):
+            if isinstance(result, Exception):
+                record_swallowed(result)
+                result = loaders[name][1]
+            sections[name] = result
 
         full_response = {
             "query": query,
@@ -518,46 +1310,105 @@ def get_company(
             "company_name": longname,
             "title": longname,
             "quote_type": quote_type,
-            "quote": quote,
-            "news": deduped_news,
-            "profile": profile,
-            "fundamentals": fundamentals,
-            "analyst": analyst,
-            "calendar": calendar,
-            "holders": holders,
-            "etf_data": etf_data,
-            "crypto_data": crypto_data,
+            **sections,
             "search_results": search_results
         }
 
         if fields:
-            requested_fields = [f.strip().lower() for f in fields.split(",")]
-            field_map = {
-                "query": "query",
-                "matched_ticker": "matched_ticker",
-                "company_name": "company_name",
-                "title": "title",
-                "quote_type": "quote_type",
-                "quote": "quote",
-                "news": "news",
-                "profile": "profile",
-                "fundamentals": "fundamentals",
-                "analyst": "analyst",
-                "calendar": "calendar",
-                "holders": "holders",
-                "etf_data": "etf_data",
-                "crypto_data": "crypto_data",
-                "search_results": "search_results"
-            }
             filtered_response = {}
             for field in requested_fields:
-                key = field_map.get(field)
-                if key and key in full_response:
-                    filtered_response[key] = full_response[key]
+                if field in COMPANY_FIELDS and field in full_response:
+                    filtered_response[field] = full_response[field]
             if not filtered_response:
                 return {"data": {}}
             return {"data": filtered_response}
         else:
-            return {"data": full_response}
+            return {"data": {field: full_response[field] for field in COMPANY_FIELDS}}
     except Exception as e:
-        return {"data": {}}
\ No newline at end of file
+        record_swallowed(e)
+        return {"data": {}}
+
+# Yahoo's v7 quote endpoint rejects overly long symbol lists
+QUOTE_CHUNK_SIZE = 100
+MAX_BATCH_ITEMS = 1000
+BATCH_CONCURRENCY = 16
+
+# Quotes are batched across tickers instead of going through these
+BATCH_SECTIONS = {
+    **{name: section for name, section in TICKER_SECTIONS.items() if name != "quote"},
+    "history": (lambda ticker: scraper.get_historical_prices(ticker), {}),
+}
+
+class BatchItem(BaseModel):
+    ticker: str
+    sections: List[str] = ["quote"]
+
+@app.post(
+    "/batch",
+    summary="Fetch sections for many tickers at once, streamed as NDJSON.",
+    description="""
+Body: a list of `{"ticker": "AAPL", "sections": ["quote", "profile"]}` items.
+
+Available sections: `quote`, `profile`, `fundamentals`, `analyst`, `calendar`, `holders`, `history`, `news`.
+Quotes for all tickers are fetched through the quote API's own multi-symbol batching; every other
+section is fetched per ticker, concurrently, under the scraper's rate limiter.
+
+Each result is written as one JSON line as soon as it completes:
+`{"ticker": "AAPL", "section": "profile", "data": {...}}`
+"""
+)
+async def batch(items: List[BatchItem]):
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ITEMS} items per batch")
+
+    quote_tickers = []
+    jobs = []
+    for item in items:
+        ticker = item.ticker.strip()
+        if not ticker:
+            continue
+        for section in dict.fromkeys(s.strip().lower() for s in item.sections):
+            if section == "quote":
+                if ticker not in quote_tickers:
+                    quote_tickers.append(ticker)
+            elif section in BATCH_SECTIONS:
+                jobs.append((ticker, section))
+
+    results = asyncio.Queue()
+    limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run_quotes(chunk):
+        async with limit:
+            try:
+                quotes = await scraper.get_realtime_quotes(chunk)
+            except Exception as e:
+                record_swallowed(e)
+                quotes = {}
+        for ticker in chunk:
+            await results.put({"ticker": ticker, "section": "quote", "data": quotes.get(ticker, {})})
+
+    async def run_section(ticker, section):
+        loader, default = BATCH_SECTIONS[section]
+        async with limit:
+            try:
+                data = await loader(ticker)
+            except Exception as e:
+                record_swallowed(e)
+                data = default
+        await results.put({"ticker": ticker, "section": section, "data": data})
+
+    async def stream():
+        tasks = [
+            asyncio.ensure_future(run_quotes(quote_tickers[i:i + QUOTE_CHUNK_SIZE]))
+            for i in range(0, len(quote_tickers), QUOTE_CHUNK_SIZE)
+        ]
+        tasks += [asyncio.ensure_future(run_section(ticker, section)) for ticker, section in jobs]
+        try:
+            for _ in range(len(quote_tickers) + len(jobs)):
+                yield json.dumps(await results.get()) + "\n"
+        finally:
+            # Client went away: stop spending rate-limit budget on it
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
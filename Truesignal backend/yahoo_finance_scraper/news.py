@@ -0,0 +1,323 @@
+import re
+import string
+import time
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+
+_STRIP_PUNCTUATION = str.maketrans("", "", string.punctuation)
+
+
+def normalize_title(title):
+    return title.lower().translate(_STRIP_PUNCTUATION).strip()
+
+
+def max_edits(length, threshold):
+    # Largest edit distance d with d / length < threshold (same comparison
+    # as the ratio test, so float rounding can't disagree with it)
+    length = max(1, length)
+    k = int(length * threshold)
+    while k > 0 and k / length >= threshold:
+        k -= 1
+    while (k + 1) / length < threshold:
+        k += 1
+    return k
+
+
+def bounded_levenshtein(a, b, k):
+    # Levenshtein distance if it is <= k, otherwise k + 1. Only the diagonal
+    # band of width 2k+1 is computed and we stop once a whole row exceeds k.
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > k:
+        return k + 1
+    # Common prefix/suffix never changes the distance
+    start = 0
+    end_a, end_b = len(a), len(b)
+    while start < end_b and a[start] == b[start]:
+        start += 1
+    while end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a = a[start:end_a]
+    b = b[start:end_b]
+    la, lb = len(a), len(b)
+    if lb == 0:
+        return la if la <= k else k + 1
+    over = k + 1
+    previous = [j if j <= k else over for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        lo = max(1, i - k)
+        hi = min(lb, i + k)
+        current = [over] * (lb + 1)
+        if i <= k:
+            current[0] = i
+        c1 = a[i - 1]
+        row_min = current[lo - 1]
+        for j in range(lo, hi + 1):
+            value = previous[j - 1] + (c1 != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > k:
+            return over
+        previous = current
+    return min(previous[lb], over)
+
+
+class HeadlineIndex:
+    # Near-duplicate clusters of normalised headlines for one ticker.
+    #
+    # Every title ever seen maps straight to its cluster, so a recurring
+    # headline costs one dict lookup. New titles are only edit-distance
+    # checked against cluster representatives that pass the q-gram count
+    # filter (two strings within k edits share at least
+    # max(len) - q + 1 - k*q q-grams), found through an inverted index.
+
+    def __init__(self, threshold=0.15, q=3, max_clusters=1000):
+        self.threshold = threshold
+        self.q = q
+        self.max_clusters = max_clusters
+        self.titles = {}  # normalised title -> cluster id
+        self.reps = OrderedDict()  # cluster id -> (title, q-gram counts)
+        self.members = {}  # cluster id -> titles mapped to it
+        self.first_seen = {}  # cluster id -> timestamp
+        self.postings = {}  # q-gram -> {cluster id: count}
+        self.short = {}  # cluster id -> title, for titles with no q-grams
+        self._next_id = 0
+
+    def _grams(self, title):
+        q = self.q
+        return Counter(title[i:i + q] for i in range(len(title) - q + 1))
+
+    def _match(self, title, grams):
+        la = len(title)
+        if not grams:
+            candidates = self.short
+        else:
+            common = {}
+            for gram, count in grams.items():
+                for cid, rep_count in self.postings.get(gram, {}).items():
+                    common[cid] = common.get(cid, 0) + (count if count < rep_count else rep_count)
+            candidates = {}
+            for cid, shared in common.items():
+                rep = self.reps[cid][0]
+                longest = la if la > len(rep) else len(rep)
+                k = max_edits(longest, self.threshold)
+                if shared >= longest - self.q + 1 - k * self.q:
+                    candidates[cid] = rep
+        for cid in sorted(candidates):
+            rep = candidates[cid]
+            longest = la if la > len(rep) else len(rep)
+            k = max_edits(longest, self.threshold)
+            if abs(la - len(rep)) > k:
+                continue
+            if bounded_levenshtein(title, rep, k) <= k:
+                return cid
+        return None
+
+    def _add_cluster(self, title, grams):
+        cid = self._next_id
+        self._next_id += 1
+        self.reps[cid] = (title, grams)
+        self.members[cid] = []
+        self.first_seen[cid] = time.time()
+        if grams:
+            for gram, count in grams.items():
+                self.postings.setdefault(gram, {})[cid] = count
+        else:
+            self.short[cid] = title
+        if len(self.reps) > self.max_clusters:
+            self._evict(next(iter(self.reps)))
+        return cid
+
+    def _evict(self, cid):
+        title, grams = self.reps.pop(cid)
+        for gram in grams:
+            posting = self.postings[gram]
+            del posting[cid]
+            if not posting:
+                del self.postings[gram]
+        self.short.pop(cid, None)
+        self.first_seen.pop(cid, None)
+        for member in self.members.pop(cid):
+            self.titles.pop(member, None)
+
+    def cluster_of(self, title):
+        cid = self.titles.get(title)
+        if cid is not None:
+            self.reps.move_to_end(cid)
+            return cid
+        grams = self._grams(title)
+        cid = self._match(title, grams)
+        if cid is None:
+            cid = self._add_cluster(title, grams)
+        else:
+            self.reps.move_to_end(cid)
+        self.titles[title] = cid
+        self.members[cid].append(title)
+        return cid
+
+
+class NewsDeduper:
+    # Drops near-duplicate headlines (normalised edit distance below
+    # `threshold`). With a ticker, its HeadlineIndex is kept across requests.
+
+    def __init__(self, threshold=0.15, max_tickers=2000, max_clusters=1000):
+        self.threshold = threshold
+        self.max_tickers = max_tickers
+        self.max_clusters = max_clusters
+        self._indexes = OrderedDict()
+
+    def index(self, ticker):
+        index = self._indexes.get(ticker)
+        if index is None:
+            index = self._indexes[ticker] = HeadlineIndex(self.threshold, max_clusters=self.max_clusters)
+            if len(self._indexes) > self.max_tickers:
+                self._indexes.popitem(last=False)
+        else:
+            self._indexes.move_to_end(ticker)
+        return index
+
+    def dedupe(self, items, ticker=None, limit=None):
+        index = self.index(ticker) if ticker else HeadlineIndex(self.threshold)
+        kept = []
+        emitted = set()
+        for item in items:
+            norm = normalize_title(item.get("title", ""))
+            if not norm:
+                continue
+            cid = index.cluster_of(norm)
+            if cid in emitted:
+                continue
+            emitted.add(cid)
+            kept.append(item)
+            if limit is not None and len(kept) >= limit:
+                break
+        return kept
+
+
+def _to_float(value):
+    return float(value.replace(",", ""))
+
+
+def _first_chars(pattern, flags):
+    # The characters a match must start with, when the pattern begins with a
+    # plain (or escaped) literal that isn't optional; otherwise None
+    m = re.match(r"(\\[^\w]|[^\\\[\](){}.*+?^$|])([?*{]?)", pattern)
+    if not m or m.group(2):
+        return None
+    char = m.group(1)[-1]
+    return {char.lower(), char.upper()} if flags & re.I else {char}
+
+
+class NumberExtractor:
+    # Pulls numbers out of headlines with one combined, precompiled pattern.
+    # Each metric is a regex with exactly one capture group (the value) and
+    # keeps the first match in a title, as if searched on its own. The
+    # combined scan can't see a metric's match inside text another metric
+    # already matched, so in titles where something matched, metrics missing
+    # or found after another metric's match are searched again on their own.
+
+    # Joins titles for batch extraction; no registered pattern may match it
+    _SEPARATOR = "\x00"
+
+    def __init__(self):
+        self._metrics = []  # (name, pattern, flags, convert)
+        self._compiled = None
+        self._converters = {}
+        self._own = {}  # name -> (pattern compiled on its own, convert)
+
+    def register(self, name, pattern, convert=_to_float, flags=0):
+        if re.compile(pattern, flags).groups != 1:
+            raise ValueError(f"Metric pattern for {name!r} needs exactly one capture group")
+        if any(name == registered for registered, _, _, _ in self._metrics):
+            raise ValueError(f"Metric {name!r} is already registered")
+        self._metrics.append((name, pattern, flags, convert))
+        self._compiled = None
+        return self
+
+    def _pattern(self):
+        if self._compiled is None:
+            parts = []
+            starts = set()
+            self._converters = {}
+            self._own = {}
+            for i, (name, pattern, flags, convert) in enumerate(self._metrics):
+                self._own[name] = (re.compile(pattern, flags), convert)
+                first = _first_chars(pattern, flags)
+                starts = None if first is None or starts is None else starts | first
+                if flags & re.I:
+                    pattern = f"(?i:{pattern})"
+                group = f"m{i}"
+                parts.append(f"(?P<{group}>{pattern})")
+                self._converters[group] = (name, convert)
+            combined = "|".join(parts)
+            if starts:
+                # Lets the regex engine skip positions no metric can start at,
+                # instead of trying every alternative everywhere
+                combined = "(?=[%s])(?:%s)" % ("".join(re.escape(c) for c in sorted(starts)), combined)
+            self._compiled = re.compile(combined)
+        return self._compiled
+
+    def _collect(self, match, found, offset=0):
+        group = match.lastgroup
+        name, convert = self._converters[group]
+        if name not in found:
+            # The metric's own capture group directly follows its wrapper
+            found[name] = (match.start() - offset, convert(match.group(match.re.groupindex[group] + 1)))
+
+    def _finish(self, title, found):
+        # found: name -> (start in title, value) from the combined scan. No
+        # metric matches before the first match found, and a metric found
+        # there is exact; any other may have a first match hidden inside
+        # another metric's, so search it on its own from that point.
+        if not found:
+            return {}
+        first = min(start for start, _ in found.values())
+        numbers = {}
+        for name, (pattern, convert) in self._own.items():
+            hit = found.get(name)
+            if hit is not None and hit[0] == first:
+                numbers[name] = hit[1]
+                continue
+            match = pattern.search(title, first)
+            if match is not None:
+                numbers[name] = convert(match.group(1))
+        return numbers
+
+    def extract(self, title):
+        found = {}
+        for match in self._pattern().finditer(title):
+            self._collect(match, found)
+        return self._finish(title, found)
+
+    def extract_many(self, titles):
+        # One scan over all titles joined together instead of one per title
+        if not titles:
+            return []
+        starts = []
+        offset = 0
+        for title in titles:
+            starts.append(offset)
+            offset += len(title) + 1
+        found = [{} for _ in titles]
+        for match in self._pattern().finditer(self._SEPARATOR.join(titles)):
+            i = bisect_right(starts, match.start()) - 1
+            self._collect(match, found[i], starts[i])
+        return [self._finish(title, hits) for title, hits in zip(titles, found)]
+
+
+headline_numbers = (
+    NumberExtractor()
+    .register("eps%", r"EPS\s*([+-]?\d+\.?\d*)%")
+    .register("rev%", r"revenue\s*([+-]?\d+\.?\d*)%", flags=re.I)
+    .register("guide%", r"guidance\s*([+-]?\d+\.?\d*)%", flags=re.I)
+    .register("fine$", r"\$([0-9,]+)")
+    .register("layoff", r"layoff[s]?\s*(\d+)", convert=int, flags=re.I)
+)
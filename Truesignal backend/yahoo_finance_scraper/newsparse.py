@@ -0,0 +1,144 @@
+from bs4 import BeautifulSoup
+from lxml import etree
+
+NEWS_ITEM_CLASSES = ("js-stream-content", "stream-item")
+YAHOO_URL = "https://finance.yahoo.com"
+
+
+def _article(href, title, summary):
+    return {
+        "title": title,
+        "url": YAHOO_URL + href if href.startswith("/") else href,
+        "summary": summary,
+    }
+
+
+class SoupNewsParser:
+    # Reference parser: buffers the whole page and builds a full BeautifulSoup
+    # tree. Slow, but tolerant of anything the fast path chokes on.
+
+    def __init__(self, max_articles, encoding=None):
+        self.max_articles = max_articles
+        self.encoding = encoding
+        self.chunks = []
+        self.articles = []
+
+    def feed(self, chunk):
+        self.chunks.append(chunk)
+        return False
+
+    def close(self):
+        soup = BeautifulSoup(b"".join(self.chunks), "lxml", from_encoding=self.encoding)
+        self.articles = []
+        for li in soup.select(", ".join("li." + cls for cls in NEWS_ITEM_CLASSES)):
+            a = li.find("a", href=True)
+            h3 = li.find("h3")
+            p = li.find("p")
+            if a and h3:
+                self.articles.append(_article(a["href"], h3.get_text(strip=True), p.get_text(strip=True) if p else ""))
+            if len(self.articles) >= self.max_articles:
+                break
+        return self.articles
+
+
+def _text(element):
+    # Same as BeautifulSoup's get_text(strip=True)
+    return "".join(s.strip() for s in element.itertext())
+
+
+class LxmlNewsParser:
+    # Incremental lxml pull parser. Each stream item is extracted as soon as its
+    # closing tag is seen and then dropped from the tree; feed() returns True
+    # once max_articles are in hand so the caller can stop reading the body.
+
+    def __init__(self, max_articles, encoding=None):
+        self.max_articles = max_articles
+        self.parser = etree.HTMLPullParser(events=("start", "end"), tag="li", encoding=encoding)
+        self.articles = []
+        self.open_items = 0
+        self.done = False
+
+    @staticmethod
+    def _is_item(li):
+        classes = li.get("class")
+        return bool(classes) and any(cls in NEWS_ITEM_CLASSES for cls in classes.split())
+
+    def feed(self, chunk):
+        if self.done:
+            return True
+        self.parser.feed(chunk)
+        self._drain()
+        return self.done
+
+    def _drain(self):
+        for event, li in self.parser.read_events():
+            if not self._is_item(li):
+                continue
+            if event == "start":
+                self.open_items += 1
+                continue
+            self.open_items -= 1
+            a = next(li.iterfind(".//a[@href]"), None)
+            h3 = next(li.iter("h3"), None)
+            if a is not None and h3 is not None:
+                p = next(li.iter("p"), None)
+                self.articles.append(_article(a.get("href"), _text(h3), _text(p) if p is not None else ""))
+            if self.open_items == 0:
+                # Nothing outer still needs this subtree
+                li.clear(keep_tail=True)
+            if len(self.articles) >= self.max_articles:
+                self.done = True
+                return
+
+    def close(self):
+        if not self.done:
+            self.parser.close()
+            self._drain()
+        return self.articles
+
+
+NEWS_PARSERS = {"lxml": LxmlNewsParser, "soup": SoupNewsParser}
+
+
+class NewsPageParser:
+    # Feed the page as it downloads: the chosen parser runs incrementally and,
+    # if it fails or finds nothing, close() re-parses the buffered page with
+    # BeautifulSoup so a markup surprise degrades to slow rather than empty.
+
+    def __init__(self, max_articles, parser="lxml", encoding=None):
+        self.max_articles = max_articles
+        self.encoding = encoding or "utf-8"
+        self.parser = NEWS_PARSERS[parser](max_articles, encoding=self.encoding)
+        self.chunks = []
+
+    def feed(self, chunk):
+        self.chunks.append(chunk)
+        if self.parser is None:
+            return False
+        try:
+            return self.parser.feed(chunk)
+        except Exception:
+            self.parser = None
+            return False
+
+    def close(self):
+        articles = []
+        if self.parser is not None:
+            try:
+                articles = self.parser.close()
+            except Exception:
+                articles = []
+        if articles or isinstance(self.parser, SoupNewsParser):
+            return articles
+        fallback = SoupNewsParser(self.max_articles, encoding=self.encoding)
+        fallback.feed(b"".join(self.chunks))
+        return fallback.close()
+
+
+def parse_news_html(html, max_articles, parser="lxml"):
+    # One-shot parse of an already downloaded page
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    page = NewsPageParser(max_articles, parser=parser, encoding="utf-8")
+    page.feed(html)
+    return page.close()
@@ -0,0 +1,190 @@
+import asyncio
+import math
+import time
+
+from ratelimit import PRIORITY_PREFETCH, request_priority
+
+
+class Dataset:
+    # Something the prefetcher keeps warm for a ticker. `refresh` goes
+    # upstream regardless of the cache: async (ticker) -> None, or
+    # async ([tickers]) -> None when `batch` tickers fit in one call.
+
+    def __init__(self, name, refresh, ttl, host=None, batch=0):
+        self.name = name
+        self.refresh = refresh
+        self.ttl = ttl  # seconds the refreshed data stays fresh
+        self.host = host  # upstream host, for the spare-budget check
+        self.batch = batch
+
+
+class HotTickers:
+    # Request counts per key with exponential decay, so a ticker that was
+    # popular this morning cools off by the afternoon
+
+    def __init__(self, half_life=900.0, max_tracked=5000):
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self._scores = {}  # key -> (score, as of)
+
+    def _decayed(self, entry, now):
+        score, when = entry
+        return score * math.pow(0.5, (now - when) / self.half_life)
+
+    def touch(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        entry = self._scores.get(key)
+        self._scores[key] = ((self._decayed(entry, now) if entry else 0.0) + 1.0, now)
+        if len(self._scores) > self.max_tracked:
+            self._prune(now)
+
+    def _prune(self, now):
+        # Drop the coldest quarter
+        ranked = sorted(self._scores, key=lambda key: self._decayed(self._scores[key], now))
+        for key in ranked[:max(1, len(ranked) // 4)]:
+            del self._scores[key]
+
+    def top(self, n, min_score=1.0, now=None):
+        now = time.monotonic() if now is None else now
+        scored = ((self._decayed(entry, now), key) for key, entry in self._scores.items())
+        hot = sorted(((score, key) for score, key in scored if score >= min_score), reverse=True)
+        return [(key, score) for score, key in hot[:n]]
+
+    def __len__(self):
+        return len(self._scores)
+
+
+class Prefetcher:
+    # Keeps (dataset, ticker) pairs for watchlist tickers and the hottest
+    # requested ones fresh: each is refreshed once `lead` of its TTL has
+    # passed, so requests for them find the cache warm. Refreshes run at the
+    # lowest priority, a few at a time, and only while the host has spare
+    # tokens beyond `reserve`, so they don't eat into interactive budget.
+
+    def __init__(self, datasets, watchlist=(), max_hot=50, min_score=3.0, half_life=900.0, lead=0.8,
+                 interval=1.0, concurrency=2, spare=None, reserve=1, retry=60.0):
+        self.datasets = {dataset.name: dataset for dataset in datasets}
+        self.watchlist = list(dict.fromkeys(watchlist))
+        self.max_hot = max_hot  # learned (dataset, ticker) pairs kept warm; 0 = watchlist only
+        self.min_score = min_score  # decayed request count before a pair counts as hot
+        self.hot = HotTickers(half_life)
+        self.lead = lead
+        self.interval = interval
+        self.concurrency = concurrency
+        self.spare = spare  # (host) -> tokens available now, or None if unknown
+        self.reserve = reserve
+        self.retry = retry  # seconds before retrying a failed refresh
+        self._due = {}  # (dataset, ticker) -> monotonic time of next refresh
+        self._running = set()  # (dataset, ticker) being refreshed
+        self._tasks = set()
+        self._task = None
+        self.refreshed = {name: 0 for name in self.datasets}
+        self.failed = {name: 0 for name in self.datasets}
+        self.skipped = 0  # refreshes put off for lack of spare budget
+
+    def touch(self, dataset, ticker):
+        if dataset in self.datasets and ticker:
+            self.hot.touch((dataset, ticker))
+
+    def targets(self, now=None):
+        # Watchlist first, then learned pairs by heat
+        pairs = [(name, ticker) for ticker in self.watchlist for name in self.datasets]
+        if self.max_hot:
+            pairs.extend(key for key, _ in self.hot.top(self.max_hot, self.min_score, now))
+        return list(dict.fromkeys(pairs))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._tasks):
+            task.cancel()
+
+    async def _run(self):
+        while True:
+            self.tick()
+            await asyncio.sleep(self.interval)
+
+    def _has_spare(self, host):
+        if self.spare is None or host is None:
+            return True
+        tokens = self.spare(host)
+        return tokens is None or tokens >= 1 + self.reserve
+
+    def tick(self):
+        # Starts the refreshes that are due; returns how many were started
+        now = time.monotonic()
+        targets = self.targets(now)
+        wanted = set(targets)
+        for key in list(self._due):
+            if key not in wanted:
+                del self._due[key]
+        due = [key for key in targets if key not in self._running and self._due.get(key, 0.0) <= now]
+        started = 0
+        batches = {}
+        blocked = set()  # hosts found without spare budget this tick
+        for name, ticker in due:
+            dataset = self.datasets[name]
+            if dataset.batch:
+                batches.setdefault(name, []).append(ticker)
+                continue
+            if len(self._tasks) >= self.concurrency:
+                break
+            if dataset.host in blocked or not self._has_spare(dataset.host):
+                blocked.add(dataset.host)
+                self.skipped += 1
+                continue
+            self._launch(dataset, [ticker])
+            started += 1
+        for name, tickers in batches.items():
+            dataset = self.datasets[name]
+            if dataset.host in blocked or not self._has_spare(dataset.host):
+                self.skipped += 1
+                continue
+            for i in range(0, len(tickers), dataset.batch):
+                self._launch(dataset, tickers[i:i + dataset.batch])
+                started += 1
+        return started
+
+    def _launch(self, dataset, tickers):
+        keys = [(dataset.name, ticker) for ticker in tickers]
+        self._running.update(keys)
+        task = asyncio.ensure_future(self._refresh(dataset, tickers, keys))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, dataset, tickers, keys):
+        request_priority.set(PRIORITY_PREFETCH)
+        try:
+            await dataset.refresh(tickers if dataset.batch else tickers[0])
+        except Exception:
+            self.failed[dataset.name] += 1
+            next_due = time.monotonic() + self.retry
+        else:
+            self.refreshed[dataset.name] += 1
+            next_due = time.monotonic() + dataset.ttl * self.lead
+        finally:
+            self._running.difference_update(keys)
+        for key in keys:
+            self._due[key] = next_due
+
+    def stats(self):
+        now = time.monotonic()
+        targets = self.targets(now)
+        return {
+            "watchlist": self.watchlist,
+            "hot": [
+                {"dataset": name, "ticker": ticker, "score": round(score, 2)}
+                for (name, ticker), score in self.hot.top(self.max_hot, self.min_score, now)
+            ],
+            "tracked": len(self.hot),
+            "targets": len(targets),
+            "in_flight": len(self._running),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "skipped_no_budget": self.skipped,
+        }
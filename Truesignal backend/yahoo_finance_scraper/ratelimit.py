@@ -0,0 +1,163 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextvars import ContextVar
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+PRIORITY_PREFETCH = 3  # background cache warming; only ever uses otherwise idle budget
+
+# Priority of upstream calls made on behalf of the current API request
+request_priority = ContextVar("request_priority", default=PRIORITY_NORMAL)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate  # tokens per second
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def set_rate(self, rate):
+        self._refill()
+        self.rate = rate
+
+    def pause(self, seconds):
+        # No token for the next `seconds`
+        self._refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    def time_until_token(self):
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _HostQueue:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.base_rate = bucket.rate  # configured rate; backoff() lowers bucket.rate below it
+        self.backoffs = 0
+        self.waiters = []  # heap of (priority, seq, future)
+        self.dispatcher = None
+        self.acquired = 0
+        self.waited = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+
+class RateLimiter:
+    # A token bucket per upstream host. Callers that can't get a token right
+    # away queue by priority (lower first, FIFO within a priority), so
+    # interactive requests are served before queued bulk work.
+    #
+    # Rates adapt AIMD-style: each 429 multiplies a host's rate by `decrease`
+    # (never below `floor` of the configured rate) and every success adds back
+    # `increase` of the configured rate.
+
+    def __init__(self, rate=1.0, burst=1, host_limits=None, decrease=0.5, increase=0.05, floor=0.05):
+        self.rate = rate
+        self.burst = burst
+        self.host_limits = host_limits or {}  # host -> (rate, burst)
+        self.decrease = decrease
+        self.increase = increase
+        self.floor = floor
+        self._hosts = {}
+        self._seq = itertools.count()
+
+    def _host(self, host, identity=None):
+        # Budgets are per host, and per identity (session) when one is given
+        key = host if identity is None else f"{host}#{identity}"
+        queue = self._hosts.get(key)
+        if queue is None:
+            rate, burst = self.host_limits.get(host, (self.rate, self.burst))
+            queue = self._hosts[key] = _HostQueue(TokenBucket(rate, burst))
+        return queue
+
+    async def acquire(self, host, priority=None, identity=None):
+        if priority is None:
+            priority = request_priority.get()
+        queue = self._host(host, identity)
+        queue.acquired += 1
+        if not queue.waiters and queue.bucket.try_take():
+            return 0.0
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(queue.waiters, (priority, next(self._seq), future))
+        if queue.dispatcher is None or queue.dispatcher.done():
+            queue.dispatcher = asyncio.ensure_future(self._dispatch(queue))
+        await future
+        waited = time.monotonic() - start
+        queue.waited += 1
+        queue.wait_time += waited
+        queue.max_wait = max(queue.max_wait, waited)
+        return waited
+
+    async def _dispatch(self, queue):
+        while queue.waiters:
+            delay = queue.bucket.time_until_token()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(queue.waiters)
+            # Cancelled waiters don't consume a token
+            if not future.done() and queue.bucket.try_take():
+                future.set_result(None)
+
+    def backoff(self, host, identity=None, retry_after=None):
+        # Upstream said 429: slow down, and hold off entirely if it said for how long
+        queue = self._host(host, identity)
+        queue.backoffs += 1
+        queue.bucket.set_rate(max(queue.base_rate * self.floor, queue.bucket.rate * self.decrease))
+        if retry_after:
+            queue.bucket.pause(retry_after)
+
+    def recover(self, host, identity=None):
+        queue = self._host(host, identity)
+        if queue.bucket.rate < queue.base_rate:
+            queue.bucket.set_rate(min(queue.base_rate, queue.bucket.rate + queue.base_rate * self.increase))
+
+    def spare(self, host):
+        # Tokens every identity on `host` could hand out right now without
+        # anyone waiting (0 if something is queued); None if the host is unused
+        spare = None
+        for key, queue in self._hosts.items():
+            if key != host and not key.startswith(host + "#"):
+                continue
+            queue.bucket._refill()
+            tokens = 0.0 if queue.waiters else queue.bucket.tokens
+            spare = tokens if spare is None else min(spare, tokens)
+        return spare
+
+    def stats(self):
+        return {
+            host: {
+                "rate": round(queue.bucket.rate, 6),
+                "base_rate": queue.base_rate,
+                "backoffs": queue.backoffs,
+                "burst": queue.bucket.burst,
+                "tokens": round(queue.bucket.tokens, 3),
+                "queue_depth": len(queue.waiters),
+                "acquired": queue.acquired,
+                "waited": queue.waited,
+                "wait_time_total": round(queue.wait_time, 3),
+                "wait_time_avg": round(queue.wait_time / queue.waited, 3) if queue.waited else 0.0,
+                "wait_time_max": round(queue.max_wait, 3),
+            }
+            for host, queue in self._hosts.items()
+        }
@@ -0,0 +1,144 @@
+import io
+import json
+
+import numpy as np
+import orjson
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def _column(values, length, dtype=np.float64):
+    # Yahoo uses null for missing bars; those become NaN
+    if values is None:
+        return np.full(length, np.nan, dtype=dtype)
+    return np.array(values, dtype=dtype)
+
+
+class PriceSeries:
+    # Columnar OHLCV bars: one NumPy array per field instead of the parallel
+    # Python lists nested in Yahoo's chart result.
+
+    def __init__(self, timestamp, columns, meta=None, extra=None):
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        self.columns = columns  # field -> float64 array, same length as timestamp
+        self.meta = meta or {}
+        self.extra = extra or {}  # other chart keys (e.g. events), passed through as-is
+
+    @classmethod
+    def from_chart(cls, chart):
+        chart = chart or {}
+        timestamp = chart.get("timestamp") or []
+        n = len(timestamp)
+        indicators = chart.get("indicators") or {}
+        quote = (indicators.get("quote") or [{}])[0] or {}
+        columns = {field: _column(quote.get(field), n) for field in PRICE_FIELDS}
+        adjclose = (indicators.get("adjclose") or [{}])[0] or {}
+        if "adjclose" in adjclose:
+            columns["adjclose"] = _column(adjclose["adjclose"], n)
+        extra = {k: v for k, v in chart.items() if k not in ("meta", "timestamp", "indicators")}
+        return cls(timestamp, columns, chart.get("meta") or {}, extra)
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def to_chart(self):
+        # Same shape as Yahoo's chart result, but with NumPy arrays as leaves
+        if not len(self) and not self.meta:
+            return {}
+        indicators = {"quote": [{field: self.columns[field] for field in PRICE_FIELDS}]}
+        if "adjclose" in self.columns:
+            indicators["adjclose"] = [{"adjclose": self.columns["adjclose"]}]
+        return {"meta": self.meta, "timestamp": self.timestamp, "indicators": indicators, **self.extra}
+
+    def to_dict(self):
+        # Yahoo's chart shape with plain Python lists (null for missing values)
+        chart = self.to_chart()
+        if not chart:
+            return {}
+
+        def plain(array):
+            values = array.tolist()
+            if array.dtype.kind == "f":
+                values = [None if v != v else v for v in values]
+            return values
+
+        indicators = {"quote": [{field: plain(self.columns[field]) for field in PRICE_FIELDS}]}
+        if "adjclose" in self.columns:
+            indicators["adjclose"] = [{"adjclose": plain(self.columns["adjclose"])}]
+        return {**chart, "timestamp": self.timestamp.tolist(), "indicators": indicators}
+
+    def since(self, start):
+        # Bars at or after `start` (unix seconds)
+        i = int(np.searchsorted(self.timestamp, start, side="left"))
+        return PriceSeries(self.timestamp[i:], {k: v[i:] for k, v in self.columns.items()}, self.meta, self.extra)
+
+    def merge(self, newer):
+        # Newer bars win: everything from newer's first timestamp on is replaced
+        if not len(newer):
+            return PriceSeries(self.timestamp, self.columns, newer.meta or self.meta, self.extra)
+        keep = int(np.searchsorted(self.timestamp, newer.timestamp[0], side="left"))
+        names = list(self.columns) + [k for k in newer.columns if k not in self.columns]
+        columns = {
+            name: np.concatenate([
+                self.columns.get(name, np.full(len(self), np.nan))[:keep],
+                newer.columns.get(name, np.full(len(newer), np.nan)),
+            ])
+            for name in names
+        }
+        return PriceSeries(
+            np.concatenate([self.timestamp[:keep], newer.timestamp]), columns, newer.meta or self.meta, self.extra,
+        )
+
+    def to_json(self):
+        # orjson writes the arrays directly (NaN as null), no per-value boxing
+        return orjson.dumps(self.to_chart(), option=orjson.OPT_SERIALIZE_NUMPY)
+
+    def _arrays(self):
+        return {"timestamp": self.timestamp, **self.columns}
+
+    def to_npz(self):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, meta=np.array(json.dumps(self.meta)), **self._arrays())
+        return buffer.getvalue()
+
+    def to_msgpack(self):
+        if msgpack is None:
+            raise RuntimeError("format=msgpack requires the msgpack package")
+        # Raw little-endian buffers: decode with numpy.frombuffer / JS typed arrays
+        return msgpack.packb({
+            "meta": self.meta,
+            "length": len(self),
+            "columns": {
+                name: {"dtype": array.dtype.newbyteorder("<").str, "data": array.astype(array.dtype.newbyteorder("<")).tobytes()}
+                for name, array in self._arrays().items()
+            },
+        })
+
+    def to_arrow(self):
+        if pa is None:
+            raise RuntimeError("format=arrow requires the pyarrow package")
+        table = pa.table(
+            {name: pa.array(array, from_pandas=True) for name, array in self._arrays().items()},
+        ).replace_schema_metadata({"meta": json.dumps(self.meta)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+SERIES_FORMATS = {
+    "json": ("application/json", PriceSeries.to_json),
+    "npz": ("application/octet-stream", PriceSeries.to_npz),
+    "msgpack": ("application/msgpack", PriceSeries.to_msgpack),
+    "arrow": ("application/vnd.apache.arrow.stream", PriceSeries.to_arrow),
+}
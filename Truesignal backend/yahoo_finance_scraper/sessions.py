@@ -0,0 +1,163 @@
+import asyncio
+import itertools
+import time
+
+
+def export_cookies(client):
+    return [
+        {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+        for c in client.cookies.jar
+    ]
+
+
+def import_cookies(client, cookies):
+    for c in cookies:
+        client.cookies.set(c["name"], c["value"], domain=c["domain"], path=c["path"])
+
+
+class YahooSession:
+    # One Yahoo identity: its own client (and so its own cookie jar) plus the
+    # crumb that goes with those cookies.
+
+    def __init__(self, index, client):
+        self.index = index
+        self.client = client
+        self.crumb = None
+        self.refreshed_at = 0.0
+        self.refreshes = 0
+        self.failures = 0
+        self.lock = asyncio.Lock()
+
+
+class SessionPool:
+    # A pool of sessions used round-robin. Sessions are initialised lazily
+    # (first use or background warm-up) and re-initialised in the background
+    # before they reach `max_age`, so requests rarely wait on a crumb fetch.
+    #
+    # With `shared` (broker.SharedSessions) the sessions are shared between
+    # worker processes: a worker adopts the cookies and crumb another one
+    # already set up, and only one of them re-initialises a session at a time.
+
+    def __init__(self, make_client, init, size=1, max_age=1800, check_interval=60, close_grace=30, shared=None):
+        self.make_client = make_client  # () -> httpx.AsyncClient
+        self.init = init  # async (client) -> crumb
+        self.size = max(1, size)
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self.close_grace = close_grace
+        self.shared = shared
+        self.sessions = []
+        self._next = itertools.count()
+        self._task = None
+        self._closing = set()
+
+    def _ensure_sessions(self):
+        if not self.sessions:
+            self.sessions = [YahooSession(i, self.make_client()) for i in range(self.size)]
+        return self.sessions
+
+    def next(self):
+        sessions = self._ensure_sessions()
+        return sessions[next(self._next) % len(sessions)]
+
+    async def refresh(self, session, stale_crumb=None):
+        async with session.lock:
+            # Another request already (re)initialised the session while we waited
+            if session.crumb and session.crumb != stale_crumb:
+                return
+            grant = None
+            if self.shared is not None:
+                try:
+                    claim = await self.shared.claim(session.index, stale_crumb)
+                except Exception:
+                    claim = {}  # broker unavailable; set this one up locally
+                if "session" in claim:
+                    self._adopt(session, claim["session"])
+                    return
+                grant = claim.get("grant")
+            # Build the replacement on a fresh client so in-flight requests on
+            # the old one aren't disturbed, then swap both in together
+            client = self.make_client()
+            try:
+                crumb = await self.init(client)
+            except BaseException:
+                session.failures += 1
+                await client.aclose()
+                if grant is not None:
+                    await self._shared_call(self.shared.release(session.index, grant))
+                raise
+            self._swap(session, client, crumb, time.monotonic())
+            if self.shared is not None:
+                await self._shared_call(self.shared.publish(session.index, crumb, export_cookies(client)))
+
+    def _adopt(self, session, shared):
+        client = self.make_client()
+        import_cookies(client, shared["cookies"])
+        # Age it from when it was actually set up, so max_age holds across workers
+        age = max(0.0, time.time() - shared["refreshed"])
+        self._swap(session, client, shared["crumb"], time.monotonic() - age)
+
+    @staticmethod
+    async def _shared_call(call):
+        try:
+            await call
+        except Exception:
+            pass
+
+    def _swap(self, session, client, crumb, refreshed_at):
+        old_client = session.client
+        session.client = client
+        session.crumb = crumb
+        session.refreshed_at = refreshed_at
+        session.refreshes += 1
+        if old_client is not None:
+            self._close_later(old_client)
+
+    def _close_later(self, client):
+        async def close():
+            await asyncio.sleep(self.close_grace)
+            await client.aclose()
+
+        task = asyncio.ensure_future(close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._maintain())
+
+    async def _maintain(self):
+        while True:
+            for session in self._ensure_sessions():
+                age = time.monotonic() - session.refreshed_at
+                if session.crumb and age < self.max_age:
+                    continue
+                try:
+                    await self.refresh(session, stale_crumb=session.crumb)
+                except Exception:
+                    # Leave it for the next pass; requests can still init it on demand
+                    pass
+            await asyncio.sleep(self.check_interval)
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._closing):
+            task.cancel()
+        for session in self.sessions:
+            await session.client.aclose()
+        self.sessions = []
+
+    def stats(self):
+        now = time.monotonic()
+        return [
+            {
+                "index": session.index,
+                "ready": bool(session.crumb),
+                "age": round(now - session.refreshed_at, 1) if session.crumb else None,
+                "refreshes": session.refreshes,
+                "failures": session.failures,
+            }
+            for session in self.sessions
+        ]
@@ -0,0 +1,387 @@
+import asyncio
+import os
+import re
+import time
+
+import numpy as np
+
+# quoteSummary modules flattened into the table
+SNAPSHOT_MODULES = ("summaryDetail", "defaultKeyStatistics", "financialData")
+
+# Numeric fields those modules can carry; screening on one no ticker has
+# supplied yet matches nothing rather than failing as an unknown column
+SNAPSHOT_FIELDS = frozenset({
+    # summaryDetail
+    "previousClose", "open", "dayLow", "dayHigh", "regularMarketPreviousClose", "regularMarketOpen",
+    "regularMarketDayLow", "regularMarketDayHigh", "dividendRate", "dividendYield", "exDividendDate",
+    "payoutRatio", "fiveYearAvgDividendYield", "beta", "trailingPE", "forwardPE", "volume",
+    "regularMarketVolume", "averageVolume", "averageVolume10days", "averageDailyVolume10Day", "bid", "ask",
+    "bidSize", "askSize", "marketCap", "yield", "ytdReturn", "totalAssets", "fiftyTwoWeekLow",
+    "fiftyTwoWeekHigh", "priceToSalesTrailing12Months", "fiftyDayAverage", "twoHundredDayAverage",
+    "trailingAnnualDividendRate", "trailingAnnualDividendYield", "navPrice", "openInterest",
+    "circulatingSupply", "volume24Hr", "volumeAllCurrencies", "maxSupply", "startDate",
+    # defaultKeyStatistics
+    "enterpriseValue", "profitMargins", "floatShares", "sharesOutstanding", "sharesShort",
+    "sharesShortPriorMonth", "sharesPercentSharesOut", "heldPercentInsiders", "heldPercentInstitutions",
+    "shortRatio", "shortPercentOfFloat", "impliedSharesOutstanding", "bookValue", "priceToBook",
+    "annualReportExpenseRatio", "beta3Year", "lastFiscalYearEnd", "nextFiscalYearEnd", "mostRecentQuarter",
+    "earningsQuarterlyGrowth", "revenueQuarterlyGrowth", "netIncomeToCommon", "trailingEps", "forwardEps",
+    "pegRatio", "lastSplitDate", "enterpriseToRevenue", "enterpriseToEbitda", "SandP52WeekChange",
+    "lastDividendValue", "lastDividendDate", "threeYearAverageReturn", "fiveYearAverageReturn",
+    "morningStarOverallRating", "morningStarRiskRating", "annualHoldingsTurnover",
+    # financialData
+    "currentPrice", "targetHighPrice", "targetLowPrice", "targetMeanPrice", "targetMedianPrice",
+    "recommendationMean", "numberOfAnalystOpinions", "totalCash", "totalCashPerShare", "ebitda", "totalDebt",
+    "quickRatio", "currentRatio", "totalRevenue", "debtToEquity", "revenuePerShare", "returnOnAssets",
+    "returnOnEquity", "grossProfits", "freeCashflow", "operatingCashflow", "earningsGrowth", "revenueGrowth",
+    "grossMargins", "ebitdaMargins", "operatingMargins",
+})
+
+# Bookkeeping fields, not data
+_SKIP_FIELDS = frozenset({"maxAge", "priceHint"})
+
+_TOKEN = re.compile(r"\s*(?:(?P<num>-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)(?P<pct>%?)|(?P<op><=|>=|==|!=|<|>|\(|\))|(?P<name>[A-Za-z_][A-Za-z0-9_]*))")
+_OPS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+_FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "==", "!=": "!="}
+
+
+def flatten(summary):
+    # {module: {field: {"raw": x, "fmt": ...} | x}} -> {field: float}; the
+    # first module listing a field wins, text values are dropped
+    row = {}
+    for module in SNAPSHOT_MODULES:
+        for field, value in (summary.get(module) or {}).items():
+            if field in _SKIP_FIELDS or field in row:
+                continue
+            if isinstance(value, dict):
+                value = value.get("raw")
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                row[field] = float(value)
+    return row
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if m is None or m.end() == pos:
+            raise ValueError(f"Can't parse screen expression at {text[pos:pos + 20]!r}")
+        pos = m.end()
+        if m.group("num") is not None:
+            value = float(m.group("num"))
+            tokens.append(("num", value / 100 if m.group("pct") else value))
+        elif m.group("op") is not None:
+            tokens.append(("op", m.group("op")))
+        else:
+            name = m.group("name")
+            tokens.append(("kw", name.lower()) if name.lower() in ("and", "or", "not") else ("name", name))
+    return tokens
+
+
+class _Parser:
+    # expr := term ("or" term)*; term := factor ("and" factor)*
+    # factor := "not" factor | "(" expr ")" | name op number | number op name
+
+    def __init__(self, tokens, column):
+        self.tokens = tokens
+        self.pos = 0
+        self.column = column  # name -> array
+        self.names = []
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _take(self, kind=None, value=None):
+        token = self._peek()
+        if token[0] is None or (kind and token[0] != kind) or (value and token[1] != value):
+            expected = value or {"num": "a number", "name": "a column name"}.get(kind, "more input")
+            found = token[1] if token[0] is not None else "end of expression"
+            raise ValueError(f"Expected {expected} in screen expression, found {found!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        mask = self._expr()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected {self._peek()[1]!r} in screen expression")
+        return mask
+
+    def _expr(self):
+        mask = self._term()
+        while self._peek() == ("kw", "or"):
+            self._take()
+            mask = mask | self._term()
+        return mask
+
+    def _term(self):
+        mask = self._factor()
+        while self._peek() == ("kw", "and"):
+            self._take()
+            mask = mask & self._factor()
+        return mask
+
+    def _factor(self):
+        kind, value = self._peek()
+        if (kind, value) == ("kw", "not"):
+            self._take()
+            return ~self._factor()
+        if (kind, value) == ("op", "("):
+            self._take()
+            mask = self._expr()
+            self._take("op", ")")
+            return mask
+        if kind == "num":
+            number = self._take()[1]
+            op = self._comparison()
+            name = self._take("name")[1]
+            return self._compare(name, _FLIPPED[op], number)
+        name = self._take("name")[1]
+        op = self._comparison()
+        return self._compare(name, op, self._take("num")[1])
+
+    def _comparison(self):
+        op = self._take("op")[1]
+        if op not in _OPS:
+            raise ValueError(f"Expected a comparison in screen expression, found {op!r}")
+        return op
+
+    def _compare(self, name, op, number):
+        self.names.append(name)
+        # NaN (field missing for a ticker) compares false, so it never matches
+        with np.errstate(invalid="ignore"):
+            return _OPS[op](self.column(name), number)
+
+
+class FundamentalsTable:
+    # One row per ticker, one float64 column per flattened field (NaN where a
+    # ticker lacks it), so screens are whole-column NumPy operations.
+
+    def __init__(self, path=None, max_columns=500):
+        self.path = path  # .npz the table is saved to and reloaded from
+        self.max_columns = max_columns
+        self.symbols = []
+        self._rows = {}  # symbol -> row number
+        self._capacity = 0
+        self.columns = {}  # field -> float64 array of _capacity
+        self.updated = np.empty(0)  # epoch seconds each row was last written
+        self.screens = 0
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _grow(self, rows):
+        capacity = max(64, self._capacity)
+        while capacity < rows:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        for name, array in self.columns.items():
+            grown = np.full(capacity, np.nan)
+            grown[:self._capacity] = array
+            self.columns[name] = grown
+        updated = np.zeros(capacity)
+        updated[:self._capacity] = self.updated
+        self.updated = updated
+        self._capacity = capacity
+
+    def _column(self, name):
+        array = self.columns.get(name)
+        if array is None:
+            array = self.columns[name] = np.full(self._capacity, np.nan)
+        return array
+
+    def upsert(self, symbol, summary, updated=None):
+        # Merges the modules present in `summary`; other columns keep their values
+        row = flatten(summary)
+        if not symbol or not row:
+            return False
+        symbol = symbol.upper()
+        index = self._rows.get(symbol)
+        if index is None:
+            index = self._rows[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self._grow(len(self.symbols))
+        for name, value in row.items():
+            if name in self.columns or len(self.columns) < self.max_columns:
+                self._column(name)[index] = value
+        self.updated[index] = time.time() if updated is None else updated
+        return True
+
+    def prune(self, keep, max_age, now=None):
+        # Drops rows for tickers outside `keep` not written in `max_age`
+        # seconds, and columns left empty; returns how many rows went
+        now = time.time() if now is None else now
+        keep = {symbol.upper() for symbol in keep}
+        kept = [i for i, symbol in enumerate(self.symbols) if symbol in keep or now - self.updated[i] < max_age]
+        dropped = len(self.symbols) - len(kept)
+        if not dropped:
+            return 0
+        index = np.array(kept, dtype=np.intp)
+        self.columns = {
+            name: array[index] for name, array in self.columns.items() if not np.isnan(array[index]).all()
+        }
+        self.updated = self.updated[index]
+        self.symbols = [self.symbols[i] for i in kept]
+        self._rows = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._capacity = len(self.symbols)
+        self._grow(len(self.symbols))
+        return dropped
+
+    def _data(self, name):
+        array = self.columns.get(name)
+        if array is None and name in SNAPSHOT_FIELDS:
+            return np.full(len(self.symbols), np.nan)
+        if array is None:
+            raise ValueError(f"Unknown column {name!r}; see /screen/stats for the available ones")
+        return array[:len(self.symbols)]
+
+    def screen(self, where="", sort=None, limit=50, fields=None):
+        # where: comparisons of a column with a number, combined with and/or/not
+        # and parentheses ("trailingPE<20 and revenueGrowth>10%"); sort: a
+        # column, "-" prefixed for descending, missing values last
+        self.screens += 1
+        n = len(self.symbols)
+        parser = _Parser(_tokenize(where), self._data) if where and where.strip() else None
+        mask = parser.parse() if parser is not None else np.ones(n, dtype=bool)
+        matched = np.flatnonzero(mask)
+        if sort:
+            descending = sort.startswith("-")
+            name = sort.lstrip("+-")
+            values = self._data(name)[matched]
+            key = np.where(np.isnan(values), np.inf, -values if descending else values)
+            if 0 < limit < len(matched):
+                # Top-k: partition first so only k rows get sorted
+                part = np.argpartition(key, limit - 1)[:limit]
+                order = part[np.argsort(key[part], kind="stable")]
+            else:
+                order = np.argsort(key, kind="stable")
+            picked = matched[order]
+        else:
+            name = None
+            picked = matched
+        if limit > 0:
+            picked = picked[:limit]
+        if fields:
+            columns = list(dict.fromkeys(fields))
+        else:
+            columns = list(dict.fromkeys((parser.names if parser else []) + ([name] if name else [])))
+        data = {column: self._data(column)[picked] for column in columns}
+        rows = []
+        for i, index in enumerate(picked.tolist()):
+            row = {"symbol": self.symbols[index]}
+            for column, values in data.items():
+                value = values[i]
+                row[column] = None if np.isnan(value) else float(value)
+            rows.append(row)
+        return {"matched": int(len(matched)), "universe": n, "rows": rows}
+
+    def stats(self):
+        n = len(self.symbols)
+        updated = self.updated[:n]
+        return {
+            "tickers": n,
+            "columns": {name: int(np.count_nonzero(~np.isnan(array[:n]))) for name, array in sorted(self.columns.items())},
+            "oldest": float(updated.min()) if n else None,
+            "newest": float(updated.max()) if n else None,
+            "screens": self.screens,
+        }
+
+    def save(self, path=None):
+        path = path or self.path
+        if not path:
+            return
+        n = len(self.symbols)
+        tmp = f"{path}.tmp.npz"
+        np.savez(
+            tmp,
+            __symbols__=np.array(self.symbols, dtype=str),
+            __updated__=self.updated[:n],
+            **{f"c_{name}": array[:n] for name, array in self.columns.items()},
+        )
+        os.replace(tmp, path)
+
+    def load(self, path):
+        with np.load(path) as data:
+            self.symbols = [str(s) for s in data["__symbols__"]]
+            self._rows = {symbol: i for i, symbol in enumerate(self.symbols)}
+            self._capacity = 0
+            self.columns = {}
+            self.updated = np.empty(0)
+            self._grow(len(self.symbols))
+            n = len(self.symbols)
+            self.updated[:n] = data["__updated__"]
+            for key in data.files:
+                if key.startswith("c_"):
+                    self._column(key[2:])[:n] = data[key]
+
+
+class SnapshotRefresher:
+    # Re-reads the snapshot modules for a universe of tickers every
+    # `interval` seconds (cache hits are free, the rest go upstream at bulk
+    # priority via `fetch`), drops rows outside it that nothing has written
+    # for `max_age` seconds, then saves the table
+
+    def __init__(self, table, fetch, universe, interval=3600.0, concurrency=4, max_age=86400.0):
+        self.table = table
+        self.fetch = fetch  # async (ticker) -> quoteSummary modules
+        self.universe = universe  # () -> tickers
+        self.interval = interval
+        self.concurrency = concurrency
+        self.max_age = max_age
+        self.pruned = 0
+        self.last_run = None
+        self.last_duration = None
+        self.failed = 0
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self.refresh(self.universe())
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self, tickers):
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(ticker):
+            async with semaphore:
+                try:
+                    self.table.upsert(ticker, await self.fetch(ticker))
+                except Exception:
+                    self.failed += 1
+
+        tickers = list(dict.fromkeys(tickers))
+        await asyncio.gather(*(one(ticker) for ticker in tickers))
+        self.pruned += self.table.prune(tickers, self.max_age)
+        self.table.save()
+        self.last_run = time.time()
+        self.last_duration = time.monotonic() - started
+
+    def stats(self):
+        return {
+            "last_run": self.last_run,
+            "last_duration": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "failed": self.failed,
+            "pruned": self.pruned,
+            "interval": self.interval,
+        }
@@ -0,0 +1,119 @@
+import asyncio
+
+_MISSING = object()
+
+
+class QuoteSubscriber:
+    def __init__(self, multiplexer, symbols=()):
+        self.multiplexer = multiplexer
+        self.symbols = set()
+        # Changes not yet delivered, merged per symbol so a slow consumer
+        # gets the latest values instead of a growing backlog
+        self.pending = {}
+        self.event = asyncio.Event()
+        self.subscribe(symbols)
+
+    def subscribe(self, symbols):
+        self.multiplexer._subscribe(self, set(symbols) - self.symbols)
+
+    def unsubscribe(self, symbols):
+        self.multiplexer._unsubscribe(self, set(symbols) & self.symbols)
+
+    def close(self):
+        self.unsubscribe(set(self.symbols))
+        self.multiplexer._subscribers.discard(self)
+
+    def _push(self, symbol, fields):
+        self.pending.setdefault(symbol, {}).update(fields)
+        self.event.set()
+
+    async def next(self, timeout=None):
+        # Waits for the next batch of changes: {symbol: {field: value}}; {} on timeout
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self.event.clear()
+        changes, self.pending = self.pending, {}
+        return changes
+
+
+class QuoteMultiplexer:
+    # One background poller for every streaming client: each tick fetches the
+    # union of all subscribed symbols (in quote-API-sized chunks) and pushes
+    # only the fields that changed to the subscribers watching them.
+
+    def __init__(self, fetch_quotes, interval=2.0, chunk_size=100):
+        self.fetch_quotes = fetch_quotes  # async (symbols) -> {symbol: quote}
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self._subscribers = set()
+        self._watchers = {}  # symbol -> set of subscribers
+        self._last = {}  # symbol -> last quote seen
+        self._task = None
+        self.ticks = 0
+        self.upstream_calls = 0
+
+    def subscribe(self, symbols=()):
+        return QuoteSubscriber(self, symbols)
+
+    def _subscribe(self, subscriber, symbols):
+        self._subscribers.add(subscriber)
+        for symbol in symbols:
+            subscriber.symbols.add(symbol)
+            self._watchers.setdefault(symbol, set()).add(subscriber)
+            # Start new subscribers off with a full snapshot when we have one
+            if symbol in self._last:
+                subscriber._push(symbol, self._last[symbol])
+        if self._watchers and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._poll())
+
+    def _unsubscribe(self, subscriber, symbols):
+        for symbol in symbols:
+            subscriber.symbols.discard(symbol)
+            subscriber.pending.pop(symbol, None)
+            watchers = self._watchers.get(symbol)
+            if watchers is not None:
+                watchers.discard(subscriber)
+                if not watchers:
+                    del self._watchers[symbol]
+                    self._last.pop(symbol, None)
+
+    async def _poll(self):
+        while self._watchers:
+            symbols = sorted(self._watchers)
+            chunks = [symbols[i:i + self.chunk_size] for i in range(0, len(symbols), self.chunk_size)]
+            self.upstream_calls += len(chunks)
+            results = await asyncio.gather(*(self.fetch_quotes(chunk) for chunk in chunks), return_exceptions=True)
+            self.ticks += 1
+            for quotes in results:
+                if isinstance(quotes, Exception):
+                    continue
+                for symbol, quote in quotes.items():
+                    self._publish(symbol, quote)
+            await asyncio.sleep(self.interval)
+
+    def _publish(self, symbol, quote):
+        watchers = self._watchers.get(symbol)
+        if not watchers:
+            return
+        previous = self._last.get(symbol, {})
+        changed = {k: v for k, v in quote.items() if previous.get(k, _MISSING) != v}
+        self._last[symbol] = quote
+        if changed:
+            for subscriber in watchers:
+                subscriber._push(symbol, changed)
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "symbols": len(self._watchers),
+            "ticks": self.ticks,
+            "upstream_calls": self.upstream_calls,
+            "interval": self.interval,
+        }
@@ -0,0 +1,275 @@
+import bisect
+import csv
+import json
+import re
+from collections import Counter
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_TICKER_SHAPED = re.compile(r"[A-Z0-9.^=-]{1,6}")
+
+# Name words too common to be worth a prefix entry of their own
+STOPWORDS = frozenset(
+    "a an and the of co inc corp corporation company ltd limited plc llc lp sa ag nv se group holdings class".split()
+)
+
+EXACT, PREFIX, WORD_PREFIX, FUZZY = range(4)
+
+
+def normalize(text):
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+
+def core_name(text):
+    # Normalised name without the corporate filler ("Apple Inc." -> "apple")
+    return " ".join(word for word in normalize(text).split() if word not in STOPWORDS)
+
+
+def trigrams(term):
+    padded = f" {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def search_item(quote):
+    # A v7 quote in the shape of a v1 search result
+    return {
+        "symbol": quote.get("symbol"),
+        "shortname": quote.get("shortName"),
+        "longname": quote.get("longName"),
+        "quoteType": quote.get("quoteType"),
+        "exchange": quote.get("exchange"),
+        "exchDisp": quote.get("fullExchangeName"),
+        "typeDisp": quote.get("typeDisp"),
+    }
+
+
+class SymbolIndex:
+    # Local ticker lookup, filled from upstream search results (and quotes)
+    # as they come in, or bulk-loaded from a symbol list. Prefix matches come
+    # from one sorted list of (term, symbol) keys, searched with bisect; terms
+    # are the symbol, the full name and each significant name word. When no
+    # prefix matches, terms sharing enough trigrams with the query are tried,
+    # so typos still resolve.
+
+    def __init__(self, fuzzy_threshold=0.5, max_scan=500):
+        self.fuzzy_threshold = fuzzy_threshold  # minimum trigram Dice similarity
+        self.max_scan = max_scan  # prefix keys examined per lookup
+        self.records = {}  # symbol -> search result dict
+        self._terms = {}  # symbol -> [(term, kind)]
+        self._keys = []  # sorted (term, symbol)
+        self._term_symbols = {}  # term -> {symbol}
+        self._grams = {}  # trigram -> {term}
+        self._sorted = True  # False while add_many defers sorting _keys
+        self.loaded = False  # seeded from a full symbol list, not just what upstream returned
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.records)
+
+    def _index_terms(self, record):
+        symbol = record["symbol"]
+        name = normalize(record.get("longname") or record.get("shortname"))
+        terms = [(symbol.lower(), "symbol")]
+        if name:
+            terms.append((name, "name"))
+            terms.extend((word, "word") for word in dict.fromkeys(name.split()) if word not in STOPWORDS)
+        return terms
+
+    def add(self, record):
+        symbol = record.get("symbol")
+        if not symbol:
+            return
+        existing = self.records.get(symbol)
+        if existing is not None:
+            # Search results carry names and a relevance score; don't let a
+            # sparser record (e.g. from a quote) wipe them out
+            record = {**existing, **{k: v for k, v in record.items() if v is not None}}
+            if record == existing:
+                return
+            self._unindex(symbol)
+        self.records[symbol] = record
+        terms = self._index_terms(record)
+        self._terms[symbol] = terms
+        for term, _ in terms:
+            if self._sorted:
+                bisect.insort(self._keys, (term, symbol))
+            else:
+                self._keys.append((term, symbol))
+            symbols = self._term_symbols.setdefault(term, set())
+            if not symbols:
+                for gram in trigrams(term):
+                    self._grams.setdefault(gram, set()).add(term)
+            symbols.add(symbol)
+
+    def add_many(self, records):
+        records = list(records)
+        if len(records) < 64:
+            for record in records:
+                if isinstance(record, dict):
+                    self.add(record)
+            return
+        # Bulk: one sort at the end instead of an insort per key
+        self._sorted = False
+        try:
+            for record in records:
+                if isinstance(record, dict):
+                    self.add(record)
+        finally:
+            self._keys.sort()
+            self._sorted = True
+
+    def _unindex(self, symbol):
+        for term, _ in self._terms.pop(symbol, ()):
+            if self._sorted:
+                i = bisect.bisect_left(self._keys, (term, symbol))
+                if i < len(self._keys) and self._keys[i] == (term, symbol):
+                    del self._keys[i]
+            else:
+                self._keys.remove((term, symbol))
+            symbols = self._term_symbols.get(term)
+            if symbols is None:
+                continue
+            symbols.discard(symbol)
+            if not symbols:
+                del self._term_symbols[term]
+                for gram in trigrams(term):
+                    terms = self._grams.get(gram)
+                    if terms is not None:
+                        terms.discard(term)
+                        if not terms:
+                            del self._grams[gram]
+
+    def load(self, path):
+        # CSV with a header (symbol, name/longname/shortname, quoteType/type,
+        # exchange) or JSON: a list of search results, or one per line
+        with open(path, newline="", encoding="utf-8") as f:
+            if path.endswith((".json", ".jsonl", ".ndjson")):
+                text = f.read().strip()
+                if text.startswith("["):
+                    records = json.loads(text)
+                else:
+                    records = [json.loads(line) for line in text.splitlines() if line.strip()]
+            else:
+                records = []
+                for row in csv.DictReader(f):
+                    row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+                    name = row.get("longname") or row.get("name") or row.get("shortname")
+                    records.append({
+                        "symbol": row.get("symbol") or row.get("ticker"),
+                        "shortname": row.get("shortname") or name,
+                        "longname": name,
+                        "quoteType": (row.get("quotetype") or row.get("type") or "EQUITY").upper(),
+                        "exchange": row.get("exchange") or None,
+                    })
+        self.add_many(records)
+        self.loaded = True
+        return len(records)
+
+    def _prefix(self, term):
+        i = bisect.bisect_left(self._keys, (term, ""))
+        for key in self._keys[i:i + self.max_scan]:
+            if not key[0].startswith(term):
+                break
+            yield key
+
+    def _fuzzy(self, term):
+        grams = trigrams(term)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        for candidate, overlap in shared.items():
+            # Dice coefficient; a term of n characters has about n trigrams
+            similarity = 2.0 * overlap / (len(grams) + len(candidate))
+            if similarity >= self.fuzzy_threshold:
+                yield candidate, similarity
+
+    def search(self, query, limit=8):
+        # Best matches first; [] means nothing local, ask upstream
+        term = normalize(query)
+        if not term:
+            return []
+        exact_symbol = query.strip().upper()
+        best = {}  # symbol -> rank key
+        for key_term, symbol in self._prefix(term):
+            kinds = {kind for t, kind in self._terms[symbol] if t == key_term}
+            if symbol.upper() == exact_symbol:
+                match = EXACT
+            elif "word" in kinds and "symbol" not in kinds and "name" not in kinds:
+                match = WORD_PREFIX
+            else:
+                match = PREFIX
+            rank = (match, 0.0)
+            if rank < best.get(symbol, (FUZZY + 1,)):
+                best[symbol] = rank
+        if not best and len(term) >= 3:
+            for candidate, similarity in self._fuzzy(term):
+                for symbol in self._term_symbols.get(candidate, ()):
+                    rank = (FUZZY, -similarity)
+                    if rank < best.get(symbol, (FUZZY + 1,)):
+                        best[symbol] = rank
+        if not best:
+            self.misses += 1
+            return []
+        self.hits += 1
+        ranked = sorted(
+            best,
+            key=lambda s: (best[s], -(self.records[s].get("score") or 0), len(s), s),
+        )
+        return [self.records[symbol] for symbol in ranked[:limit]]
+
+    def _exact(self, query, results):
+        # The result that is exactly what was typed: the symbol, or the
+        # company name give or take "Inc."/"Corp." and the like
+        symbol = query.strip().upper()
+        for record in results:
+            if record["symbol"].upper() == symbol:
+                return record
+        core = core_name(query)
+        for record in results:
+            if core and core_name(record.get("longname") or record.get("shortname")) == core:
+                return record
+        return None
+
+    def _reject(self):
+        self.hits -= 1
+        self.misses += 1
+        return []
+
+    def exact(self, query, limit=8):
+        # Like search, but only when one of the matches is exactly the query
+        # (moved to the front); anything vaguer should go to upstream search,
+        # which knows symbols this index has never seen
+        results = self.search(query, limit)
+        if not results:
+            return []
+        match = self._exact(query, results)
+        if match is None:
+            return self._reject()
+        return [match] + [record for record in results if record is not match]
+
+    def resolve(self, query, limit=8):
+        # Like exact, but a company name starting with the query also counts
+        # when the index was loaded from a full symbol list (otherwise the
+        # real company may simply not have been seen yet). A ticker-looking
+        # query ("met") that merely prefixes another name ("META") might be a
+        # symbol we don't know, so that's a miss either way.
+        results = self.search(query, limit)
+        if not results:
+            return []
+        match = self._exact(query, results)
+        if match is not None:
+            return [match] + [record for record in results if record is not match]
+        top = results[0]
+        name = normalize(top.get("longname") or top.get("shortname"))
+        if self.loaded and not _TICKER_SHAPED.fullmatch(query.strip().upper()) and name.startswith(normalize(query)):
+            return results
+        return self._reject()
+
+    def stats(self):
+        return {
+            "symbols": len(self.records),
+            "terms": len(self._term_symbols),
+            "trigrams": len(self._grams),
+            "hits": self.hits,
+            "misses": self.misses,
+        }